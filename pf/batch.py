@@ -0,0 +1,215 @@
+"""Пакетное построение учебных графиков без Streamlit.
+
+Источник программ:
+  * каталог с файлами *.csv / *.json - по одной программе на файл;
+  * JSON-манифест - список программ;
+  * CSV-манифест - длинная таблица со столбцом "Программа" и периодами всех программ.
+
+Столбцы периодов те же, что в редакторе: Год, Семестр, Тип, Недели. В JSON программа задаётся
+списком периодов или объектом {"name", "program_type", "start_year", "periods"}.
+
+Пример:
+    python batch.py programs/ -o out/ --start-year 2025 --jobs 4
+    python batch.py manifest.json --combined all.xlsx   # все программы в одной книге
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from schedule_core import EducationalScheduleApp, init_worker, worker_app
+
+PROGRAM_TYPES = {
+    'ординатура': "Ординатура (2 года)",
+    'аспирантура': "Аспирантура (3 года)",
+}
+PERIOD_COLUMNS = ['Год', 'Семестр', 'Тип', 'Недели']
+
+
+def normalize_program_type(value):
+    for prefix, program_type in PROGRAM_TYPES.items():
+        if value.lower().startswith(prefix):
+            return program_type
+    raise ValueError(f"Неизвестный тип программы: {value}")
+
+
+def make_job(name, periods, program_type, start_year):
+    return {
+        'name': name,
+        'program_type': normalize_program_type(program_type),
+        'start_year': int(start_year),
+        'periods': [{column: row[column] for column in PERIOD_COLUMNS} for row in periods],
+    }
+
+
+def read_csv_rows(path):
+    with open(path, newline='', encoding='utf-8-sig') as f:
+        return list(csv.DictReader(f))
+
+
+def jobs_from_json(data, default_name, args):
+    if isinstance(data, dict) and 'periods' not in data:
+        raise ValueError(f"{default_name}: ожидается список периодов или объект с ключом 'periods'")
+    if isinstance(data, list) and data and 'periods' in data[0]:
+        # Манифест: список программ
+        return [job for i, item in enumerate(data)
+                for job in jobs_from_json(item, item.get('name', f"{default_name}_{i + 1}"), args)]
+    if isinstance(data, dict):
+        return [make_job(data.get('name', default_name), data['periods'],
+                         data.get('program_type', args.program_type),
+                         data.get('start_year', args.start_year))]
+    return [make_job(default_name, data, args.program_type, args.start_year)]
+
+
+def jobs_from_csv(path, args):
+    rows = read_csv_rows(path)
+    name = os.path.splitext(os.path.basename(path))[0]
+    if not rows or 'Программа' not in rows[0]:
+        return [make_job(name, rows, args.program_type, args.start_year)]
+
+    # Манифест: строки группируются по программе с сохранением порядка
+    programs = {}
+    for row in rows:
+        programs.setdefault(row['Программа'], []).append(row)
+    return [make_job(program_name, program_rows,
+                     program_rows[0].get('Тип программы') or args.program_type,
+                     program_rows[0].get('Начальный год') or args.start_year)
+            for program_name, program_rows in programs.items()]
+
+
+def load_jobs(source, args):
+    if os.path.isdir(source):
+        paths = sorted(os.path.join(source, name) for name in os.listdir(source)
+                       if name.lower().endswith(('.csv', '.json')))
+    else:
+        paths = [source]
+
+    jobs = []
+    for path in paths:
+        if path.lower().endswith('.json'):
+            with open(path, encoding='utf-8') as f:
+                jobs.extend(jobs_from_json(json.load(f), os.path.splitext(os.path.basename(path))[0], args))
+        else:
+            jobs.extend(jobs_from_csv(path, args))
+    return jobs
+
+
+def output_file_names(jobs):
+    # Имена файлов без разделителей пути, чтобы запись не выходила за каталог вывода;
+    # совпадающие имена (prog.csv и prog.json, повторы в манифесте) получают номер, как листы общей книги
+    names = []
+    used = set()
+    for job in jobs:
+        stem = job['name']
+        for char in '/\\':
+            stem = stem.replace(char, '_')
+        stem = stem.strip(' .') or 'schedule'
+        file_name = f"{stem}.xlsx"
+        suffix = 1
+        while file_name.lower() in used:
+            suffix += 1
+            file_name = f"{stem}~{suffix}.xlsx"
+        used.add(file_name.lower())
+        names.append(file_name)
+    return names
+
+
+def run_job(job, path, streaming):
+    app = worker_app(range(job['start_year'], job['start_year'] + 4))
+
+    started = time.perf_counter()
+    generated_schedule = app.generate_schedule(job['periods'], job['start_year'])
+    generated = time.perf_counter()
+
+    if streaming:
+        app.export_excel_streaming(generated_schedule, job['start_year'], job['program_type'], path)
+    else:
+        wb = app.create_excel_file(generated_schedule, job['start_year'], job['program_type'])
+        wb.save(path)
+    exported = time.perf_counter()
+
+    return {
+        'name': job['name'],
+        'path': path,
+        'periods': len(generated_schedule),
+        'generate_ms': (generated - started) * 1000,
+        'export_ms': (exported - generated) * 1000,
+    }
+
+
+def export_combined(jobs, args):
+    from parallel_export import export_programs_parallel
+
+    started = time.perf_counter()
+    app = EducationalScheduleApp()
+    programs = []
+    for job in jobs:
+        generated_schedule = app.generate_schedule(job['periods'], job['start_year'])
+        programs.append((f"{job['name']} ", generated_schedule, job['start_year'], job['program_type']))
+    generated = time.perf_counter()
+
+    # Листы всех программ готовятся параллельно и собираются в одну книгу
+    export_programs_parallel(programs, args.combined, max_workers=args.jobs)
+    elapsed = time.perf_counter() - started
+
+    print(f"Готово: {len(jobs)} программ в {args.combined} за {elapsed:.2f} с "
+          f"(генерация {(generated - started) * 1000:.1f} мс, процессов: {args.jobs})")
+    return 0
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Пакетное построение учебных графиков в xlsx")
+    parser.add_argument('source', help="каталог с программами или файл-манифест (CSV/JSON)")
+    parser.add_argument('-o', '--output', default='schedules', help="каталог для xlsx")
+    parser.add_argument('--start-year', type=int, default=time.localtime().tm_year,
+                        help="начальный год по умолчанию")
+    parser.add_argument('--program-type', default="Ординатура (2 года)",
+                        help="тип программы по умолчанию: ординатура или аспирантура")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument('--streaming', action='store_true', help="потоковый экспорт (write-only)")
+    parser.add_argument('--combined', metavar='PATH',
+                        help="вместо отдельных файлов записать все программы в одну книгу")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    jobs = load_jobs(args.source, args)
+    if not jobs:
+        print("Программы не найдены", file=sys.stderr)
+        return 1
+
+    if args.combined:
+        return export_combined(jobs, args)
+
+    os.makedirs(args.output, exist_ok=True)
+    start_years = [job['start_year'] for job in jobs]
+    # Праздники нужны на все годы программ и на запас для переходящих периодов
+    years = range(min(start_years), max(start_years) + 5)
+
+    started = time.perf_counter()
+    failed = 0
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker, initargs=(years,)) as pool:
+        futures = {pool.submit(run_job, job, os.path.join(args.output, file_name), args.streaming): job
+                   for job, file_name in zip(jobs, output_file_names(jobs))}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as exc:
+                failed += 1
+                print(f"{futures[future]['name']}: ошибка: {exc}", file=sys.stderr)
+                continue
+            print(f"{result['name']}: периодов {result['periods']}, "
+                  f"генерация {result['generate_ms']:.1f} мс, экспорт {result['export_ms']:.1f} мс -> {result['path']}")
+    elapsed = time.perf_counter() - started
+
+    done = len(jobs) - failed
+    print(f"Готово: {done} из {len(jobs)} за {elapsed:.2f} с ({done / elapsed:.1f} программ/с, процессов: {args.jobs})")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
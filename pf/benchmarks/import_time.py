@@ -0,0 +1,100 @@
+"""Замеры холодного старта: время импорта модулей и первого расчёта графика в новом процессе.
+
+Каждый сценарий выполняется в отдельном интерпретаторе несколько раз; в отчёт идут медиана, минимум
+и тяжёлые пакеты (pandas, openpyxl, streamlit), загруженные сценарием.
+
+Запуск из каталога pf:
+    python benchmarks/import_time.py -o import.json
+    python benchmarks/import_time.py --repeat 20 --case "core=import schedule_core"
+    python benchmarks/import_time.py -o new.json --compare import.json
+"""
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+PF_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+HEAVY_MODULES = ['pandas', 'openpyxl', 'streamlit']
+
+# (имя, код сценария)
+CASES = [
+    ('schedule_core', "import schedule_core"),
+    ('первый график', "from schedule_core import EducationalScheduleApp, RESIDENCY_EXAMPLE\n"
+                      "EducationalScheduleApp().generate_schedule(RESIDENCY_EXAMPLE, 2025)"),
+    ('exporters.data', "import exporters.data"),
+    ('exporters.excel', "import exporters.excel"),
+    ('parallel_export', "import parallel_export"),
+    ('batch', "import batch"),
+    ('service', "import service"),
+    ('streamlit_app', "import streamlit_app"),
+]
+
+RUNNER = '''
+import json, sys, time
+started = time.perf_counter()
+exec(compile({code!r}, '<case>', 'exec'))
+elapsed = time.perf_counter() - started
+print(json.dumps({{'seconds': elapsed, 'heavy': [name for name in {heavy!r} if name in sys.modules]}}))
+'''
+
+
+def run_case(code):
+    completed = subprocess.run([sys.executable, '-c', RUNNER.format(code=code, heavy=HEAVY_MODULES)],
+                               cwd=PF_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(completed.stderr.strip().splitlines()[-1])
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def measure(code, repeat):
+    runs = [run_case(code) for _ in range(repeat)]
+    timings = [run['seconds'] for run in runs]
+    return {
+        'median_ms': statistics.median(timings) * 1000,
+        'min_ms': min(timings) * 1000,
+        'rounds': repeat,
+        'heavy_modules': runs[-1]['heavy'],
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры времени импорта и холодного старта")
+    parser.add_argument('-o', '--output', help="файл для результатов в JSON")
+    parser.add_argument('--repeat', type=int, default=7, help="число запусков на сценарий")
+    parser.add_argument('--case', action='append', metavar='ИМЯ=КОД',
+                        help="свой сценарий вместо стандартных (можно несколько)")
+    parser.add_argument('--compare', help="JSON прошлого прогона для сравнения")
+    args = parser.parse_args(argv)
+
+    cases = [tuple(case.split('=', 1)) for case in args.case] if args.case else CASES
+
+    results = {}
+    for name, code in cases:
+        try:
+            result = measure(code, args.repeat)
+        except RuntimeError as exc:
+            print(f"{name:<20} ошибка: {exc}")
+            continue
+        results[name] = result
+        print(f"{name:<20} median {result['median_ms']:9.1f} ms   min {result['min_ms']:9.1f} ms   "
+              f"загружены: {', '.join(result['heavy_modules']) or '-'}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump({'python': sys.version.split()[0], 'results': results}, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            baseline = json.load(f)['results']
+        print(f"\nСравнение с {args.compare}:")
+        for name, result in results.items():
+            if name in baseline:
+                print(f"  {name:<20} {baseline[name]['median_ms']:9.1f} -> {result['median_ms']:9.1f} ms  "
+                      f"x{result['median_ms'] / baseline[name]['median_ms']:5.2f}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
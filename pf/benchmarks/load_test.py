@@ -0,0 +1,177 @@
+"""Нагрузочный тест сервиса графиков (service.py).
+
+Несколько подразделений одновременно запрашивают сводки и файлы: большая часть запросов - типовые
+программы (одинаковые у всех), остальные - уникальные варианты с изменёнными неделями. Скрипт печатает
+пропускную способность, задержки и счётчики кеша сервиса.
+
+Запуск из каталога pf:
+    python benchmarks/load_test.py --spawn --requests 2000 --concurrency 32
+    python benchmarks/load_test.py --port 8765 --formats schedule,xlsx,ics -o load.json
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_core import POSTGRADUATE_EXAMPLE, RESIDENCY_EXAMPLE  # noqa: E402
+
+PF_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+async def http_request(reader, writer, method, path, body=b'', headers=None):
+    lines = [f"{method} {path} HTTP/1.1", "Host: localhost", f"Content-Length: {len(body)}"]
+    lines += [f"{name}: {value}" for name, value in (headers or {}).items()]
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('utf-8') + body)
+    await writer.drain()
+
+    status = int((await reader.readline()).split()[1])
+    length = 0
+    while True:
+        line = await reader.readline()
+        if not line.strip():
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        if name.strip().lower() == 'content-length':
+            length = int(value)
+    return status, await reader.readexactly(length)
+
+
+def make_request(rng, args):
+    # Типовая программа или уникальный вариант с изменёнными неделями
+    residency = rng.random() < 0.5
+    periods = [dict(row) for row in (RESIDENCY_EXAMPLE if residency else POSTGRADUATE_EXAMPLE)]
+    if rng.random() < args.unique:
+        for row in periods:
+            row['Недели'] = max(0.2, round(row['Недели'] + rng.choice([-1, 0, 1]) * rng.random(), 1))
+    body = {
+        'program_type': 'ординатура' if residency else 'аспирантура',
+        'start_year': rng.choice(args.years),
+        'periods': periods,
+    }
+    endpoint = rng.choice(args.formats)
+    path = '/schedule' if endpoint == 'schedule' else f'/export/{endpoint}'
+    tenant = f"dept-{rng.randrange(args.tenants)}"
+    return path, json.dumps(body, ensure_ascii=False).encode('utf-8'), tenant
+
+
+async def client(args, seed, counter, latencies, statuses):
+    rng = random.Random(seed)
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        while counter[0] < args.requests:
+            counter[0] += 1
+            path, body, tenant = make_request(rng, args)
+            started = time.perf_counter()
+            status, _ = await http_request(reader, writer, 'POST', path, body, {'X-Tenant': tenant})
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def fetch_stats(args):
+    reader, writer = await asyncio.open_connection(args.host, args.port)
+    try:
+        _, payload = await http_request(reader, writer, 'GET', '/stats')
+        return json.loads(payload)
+    finally:
+        writer.close()
+
+
+async def wait_for_service(args, timeout=30):
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            return await fetch_stats(args)
+        except OSError:
+            if time.monotonic() > deadline:
+                raise
+            await asyncio.sleep(0.2)
+
+
+async def run_load(args):
+    await wait_for_service(args)
+    counter = [0]
+    latencies = []
+    statuses = {}
+    started = time.perf_counter()
+    await asyncio.gather(*(client(args, args.seed + i, counter, latencies, statuses)
+                           for i in range(args.concurrency)))
+    elapsed = time.perf_counter() - started
+    return elapsed, latencies, statuses, await fetch_stats(args)
+
+
+def percentile(sorted_values, share):
+    return sorted_values[min(len(sorted_values) - 1, int(share * len(sorted_values)))]
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Нагрузочный тест сервиса графиков")
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--spawn', action='store_true', help="запустить service.py на время теста")
+    parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="процессов сервиса при --spawn")
+    parser.add_argument('-n', '--requests', type=int, default=1000, help="всего запросов")
+    parser.add_argument('-c', '--concurrency', type=int, default=16, help="одновременных соединений")
+    parser.add_argument('--tenants', type=int, default=24, help="число подразделений")
+    parser.add_argument('--unique', type=float, default=0.1, help="доля уникальных программ")
+    parser.add_argument('--formats', default='schedule,xlsx', help="через запятую: schedule, xlsx, ics, csv, json")
+    parser.add_argument('--years', default='2024,2025,2026', help="начальные годы программ")
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('-o', '--output', help="файл для результатов в JSON")
+    args = parser.parse_args(argv)
+    args.formats = args.formats.split(',')
+    args.years = [int(year) for year in args.years.split(',')]
+    return args
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    service = None
+    if args.spawn:
+        service = subprocess.Popen([sys.executable, os.path.join(PF_DIR, 'service.py'), '--host', args.host,
+                                    '--port', str(args.port), '--jobs', str(args.jobs)],
+                                   cwd=PF_DIR, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        elapsed, latencies, statuses, stats = asyncio.run(run_load(args))
+    finally:
+        if service is not None:
+            service.terminate()
+            service.wait()
+
+    latencies.sort()
+    result = {
+        'requests': len(latencies),
+        'elapsed_s': elapsed,
+        'rps': len(latencies) / elapsed,
+        'p50_ms': percentile(latencies, 0.5) * 1000,
+        'p95_ms': percentile(latencies, 0.95) * 1000,
+        'p99_ms': percentile(latencies, 0.99) * 1000,
+        'max_ms': latencies[-1] * 1000,
+        'mean_ms': statistics.fmean(latencies) * 1000,
+        'statuses': statuses,
+        'service': stats,
+    }
+    print(f"Запросов: {result['requests']} за {elapsed:.2f} с ({result['rps']:.0f} в секунду), "
+          f"соединений: {args.concurrency}")
+    print(f"Задержка, мс: p50 {result['p50_ms']:.1f}, p95 {result['p95_ms']:.1f}, "
+          f"p99 {result['p99_ms']:.1f}, максимум {result['max_ms']:.1f}")
+    print(f"Ответы: {statuses}")
+    print(f"Кеш сервиса: попаданий {stats['cache_hits']}, промахов {stats['cache_misses']}, "
+          f"объединено {stats['coalesced']}, записей {stats['cache_entries']}")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(result, f, ensure_ascii=False, indent=2)
+    return 0 if set(statuses) == {200} else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
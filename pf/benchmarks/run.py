@@ -0,0 +1,285 @@
+"""Набор замеров горячих путей: расчёт рабочих дней, генерация графика, построение и сохранение xlsx.
+
+Результаты пишутся в JSON, чтобы сравнивать прогоны и ловить регрессии перед выкладкой.
+Сценарии "[по ячейкам]" строят те же листы с объектами стилей на каждую ячейку - для сравнения
+с именованными стилями книги.
+
+Запуск из каталога pf:
+    python benchmarks/run.py -o bench.json
+    python benchmarks/run.py -o new.json --compare bench.json --threshold 0.2
+    python benchmarks/run.py --only excel --repeat 20
+"""
+import argparse
+import io
+import json
+import os
+import platform
+import random
+import statistics
+import sys
+import time
+from datetime import datetime
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import pandas as pd  # noqa: E402
+from openpyxl import Workbook  # noqa: E402
+from openpyxl.styles import Alignment, Border, Font, PatternFill, Side  # noqa: E402
+from openpyxl.utils import get_column_letter  # noqa: E402
+
+from exporters.excel import create_academic_year_calendar, register_calendar_styles  # noqa: E402
+from parallel_export import export_excel_parallel  # noqa: E402
+from schedule_core import (  # noqa: E402
+    ACTIVITY_COLORS, ACTIVITY_TYPES, CELL_ACTIVITY, CELL_HOLIDAY, CELL_PADDING, CELL_WEEKEND, HOLIDAY_COLOR,
+    PADDING_COLOR, WEEKEND_COLOR, EducationalScheduleApp, POSTGRADUATE_EXAMPLE, RESIDENCY_EXAMPLE,
+)
+
+START_YEAR = 2024
+RESIDENCY = "Ординатура (2 года)"
+POSTGRADUATE = "Аспирантура (3 года)"
+
+
+def synthetic_periods(count, total_weeks, seed=0):
+    # Периоды по циклу типов со случайной длиной, в сумме около total_weeks недель
+    rng = random.Random(seed)
+    weights = [rng.uniform(0.5, 1.5) for _ in range(count)]
+    scale = total_weeks / sum(weights)
+    types = ['Т', 'П', 'ПА', 'Т', 'П', 'К']
+    return [{"Год": 1 + i * 10 // count, "Семестр": 1 + i % 2, "Тип": types[i % len(types)],
+             "Недели": round(weight * scale, 1)} for i, weight in enumerate(weights)]
+
+
+def save_workbook(wb):
+    buffer = io.BytesIO()
+    wb.save(buffer)
+    return buffer
+
+
+def render_years(app, schedule, years):
+    # Книга на произвольное число учебных лет (для стресс-сценариев)
+    wb = Workbook()
+    styles = register_calendar_styles(wb)
+    activity_index = app.get_activity_index(schedule)
+    for academic_year in range(years):
+        actual_year = START_YEAR + academic_year
+        ws = wb.active if academic_year == 0 else wb.create_sheet()
+        ws.title = f"{actual_year}-{actual_year + 1}"
+        create_academic_year_calendar(app, ws, actual_year, styles, activity_index)
+    return wb
+
+
+def cell_styles_year_sheet(app, ws, start_year, activity_index):
+    # Эталон для сравнения с именованными стилями: тот же лист, но Font/PatternFill/Alignment/Border
+    # создаются на каждую ячейку, как было до register_calendar_styles
+    grid = app.compute_academic_year_grid(start_year, activity_index)
+    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                         top=Side(style='thin'), bottom=Side(style='thin'))
+    header_font = Font(bold=True)
+
+    def fill(color):
+        return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+    ws.merge_cells('A1:AH1')
+    ws['A1'] = f"Календарный учебный график {start_year}-{start_year + 1} г."
+    ws['A1'].font = Font(size=16, bold=True)
+    ws['A1'].alignment = Alignment(horizontal='center')
+
+    for month, first_col, month_weeks in grid.month_spans():
+        col = first_col + 2
+        if month_weeks > 1:
+            ws.merge_cells(f'{get_column_letter(col)}2:{get_column_letter(col + month_weeks - 1)}2')
+        cell = ws.cell(row=2, column=col, value=app.month_names_ru[month])
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = thin_border
+
+    for row_idx, label in [(2, 'Мес')] + list(enumerate(['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'], 3)) + [(10, 'Нед')]:
+        cell = ws.cell(row=row_idx, column=1, value=label)
+        cell.font = header_font
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = thin_border
+
+    for row_idx, (text_row, code_row) in enumerate(zip(grid.cell_texts(), grid.categories.tolist()), 3):
+        for col, (text, code) in enumerate(zip(text_row, code_row), 2):
+            cell = ws.cell(row=row_idx, column=col, value=text)
+            cell.border = thin_border
+            if code == CELL_PADDING:
+                cell.fill = fill(PADDING_COLOR)
+                continue
+            cell.alignment = Alignment(horizontal='center')
+            if code == CELL_HOLIDAY:
+                cell.fill = fill(HOLIDAY_COLOR)
+            elif code == CELL_WEEKEND:
+                cell.fill = fill(WEEKEND_COLOR)
+            elif code >= CELL_ACTIVITY:
+                cell.fill = fill(ACTIVITY_COLORS[ACTIVITY_TYPES[code - CELL_ACTIVITY]])
+                cell.alignment = Alignment(horizontal='center', vertical='center')
+                cell.font = Font(size=9)
+
+    for col, week_number in enumerate(grid.week_numbers.tolist(), 2):
+        cell = ws.cell(row=10, column=col, value=week_number)
+        cell.alignment = Alignment(horizontal='center')
+        cell.border = thin_border
+
+    ws.column_dimensions['A'].width = 6
+    for col in range(2, grid.columns + 2):
+        ws.column_dimensions[get_column_letter(col)].width = 5
+    for row in range(3, 10):
+        ws.row_dimensions[row].height = 25
+
+
+def cell_styles_workbook(app, schedule, years):
+    wb = Workbook()
+    activity_index = app.get_activity_index(schedule)
+    for academic_year in range(years):
+        ws = wb.active if academic_year == 0 else wb.create_sheet()
+        ws.title = f"{START_YEAR + academic_year}-{START_YEAR + academic_year + 1}"
+        cell_styles_year_sheet(app, ws, START_YEAR + academic_year, activity_index)
+    return wb
+
+
+def build_cases(app):
+    residency_df = pd.DataFrame(RESIDENCY_EXAMPLE)
+    postgraduate_df = pd.DataFrame(POSTGRADUATE_EXAMPLE)
+    stress_df = pd.DataFrame(synthetic_periods(200, 500))
+
+    residency = app.generate_schedule(residency_df, START_YEAR)
+    postgraduate = app.generate_schedule(postgraduate_df, START_YEAR)
+    stress = app.generate_schedule(stress_df, START_YEAR)
+    postgraduate_wb = app.create_excel_file(postgraduate, START_YEAR, POSTGRADUATE)
+    activity_index = app.get_activity_index(postgraduate)
+    start_date = datetime(START_YEAR, 9, 2)
+    fit_constraints = app.academic_boundary_constraints(postgraduate_df, START_YEAR)
+    fit_constraints.min_weeks = {'ПА': 1, 'К': 4}
+
+    def one_sheet():
+        wb = Workbook()
+        create_academic_year_calendar(app, wb.active, START_YEAR, register_calendar_styles(wb), activity_index)
+
+    # (группа, имя, функция)
+    return [
+        ('weeks', 'calculate_academic_weeks[20w]', lambda: app.calculate_academic_weeks(start_date, 20)),
+        ('weeks', 'calculate_academic_weeks[500w]', lambda: app.calculate_academic_weeks(start_date, 500)),
+        ('generate', 'generate_schedule[ординатура]', lambda: app.generate_schedule(residency_df, START_YEAR)),
+        ('generate', 'generate_schedule[аспирантура]', lambda: app.generate_schedule(postgraduate_df, START_YEAR)),
+        ('generate', 'generate_schedule[аспирантура, без pandas]',
+         lambda: app.generate_schedule(POSTGRADUATE_EXAMPLE, START_YEAR)),
+        ('generate', 'generate_schedule[200 периодов, 10 лет]', lambda: app.generate_schedule(stress_df, START_YEAR)),
+        ('fit', 'fit_period_weeks[аспирантура]',
+         lambda: app.fit_period_weeks(postgraduate_df, START_YEAR, fit_constraints)),
+        ('grid', 'compute_academic_year_grid', lambda: app.compute_academic_year_grid(START_YEAR, activity_index)),
+        ('excel', 'create_academic_year_calendar', one_sheet),
+        ('excel', 'create_academic_year_calendar[по ячейкам]',
+         lambda: cell_styles_year_sheet(app, Workbook().active, START_YEAR, activity_index)),
+        ('excel', 'create_excel_file[2 года]', lambda: app.create_excel_file(residency, START_YEAR, RESIDENCY)),
+        ('excel', 'create_excel_file[3 года]', lambda: app.create_excel_file(postgraduate, START_YEAR, POSTGRADUATE)),
+        ('excel', 'wb.save[3 года]', lambda: save_workbook(postgraduate_wb)),
+        ('excel', 'xlsx end-to-end[2 года]',
+         lambda: save_workbook(app.create_excel_file(residency, START_YEAR, RESIDENCY))),
+        ('excel', 'xlsx end-to-end[3 года]',
+         lambda: save_workbook(app.create_excel_file(postgraduate, START_YEAR, POSTGRADUATE))),
+        ('excel', 'xlsx end-to-end[3 года, по ячейкам]',
+         lambda: save_workbook(cell_styles_workbook(app, postgraduate, 3))),
+        ('excel', 'xlsx streaming[3 года]',
+         lambda: app.export_excel_streaming(postgraduate, START_YEAR, POSTGRADUATE, io.BytesIO())),
+        ('excel', 'xlsx direct XML[3 года]',
+         lambda: export_excel_parallel(postgraduate, START_YEAR, POSTGRADUATE, io.BytesIO(), max_workers=1)),
+        ('stress', 'xlsx end-to-end[200 периодов, 10 лет]', lambda: save_workbook(render_years(app, stress, 10))),
+    ]
+
+
+def measure(func, repeat, min_time):
+    # Раунд повторяет вызов, пока не наберётся min_time секунд, чтобы короткие операции мерились точно
+    func()
+    loops = 1
+    while True:
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        elapsed = time.perf_counter() - started
+        if elapsed >= min_time or loops >= 1_000_000:
+            break
+        loops *= 10
+
+    timings = [elapsed / loops]
+    for _ in range(repeat - 1):
+        started = time.perf_counter()
+        for _ in range(loops):
+            func()
+        timings.append((time.perf_counter() - started) / loops)
+
+    return {
+        'min_ms': min(timings) * 1000,
+        'median_ms': statistics.median(timings) * 1000,
+        'mean_ms': statistics.fmean(timings) * 1000,
+        'stdev_ms': statistics.stdev(timings) * 1000 if len(timings) > 1 else 0.0,
+        'rounds': repeat,
+        'loops': loops,
+    }
+
+
+def compare(results, baseline_path, threshold):
+    with open(baseline_path, encoding='utf-8') as f:
+        baseline = json.load(f)['results']
+
+    regressions = []
+    print(f"\nСравнение с {baseline_path} (порог {threshold:.0%}):")
+    for name, result in results.items():
+        if name not in baseline:
+            continue
+        ratio = result['median_ms'] / baseline[name]['median_ms']
+        marker = ''
+        if ratio > 1 + threshold:
+            marker = '  <-- регрессия'
+            regressions.append(name)
+        print(f"  {name:<45} {baseline[name]['median_ms']:10.3f} -> {result['median_ms']:10.3f} ms  "
+              f"x{ratio:5.2f}{marker}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Замеры генерации графика и экспорта в Excel")
+    parser.add_argument('-o', '--output', help="файл для результатов в JSON")
+    parser.add_argument('--repeat', type=int, default=7, help="число раундов на сценарий")
+    parser.add_argument('--min-time', type=float, default=0.05, help="минимальная длительность раунда, с")
+    parser.add_argument('--only', action='append', help="группа или подстрока имени сценария")
+    parser.add_argument('--compare', help="JSON прошлого прогона для сравнения")
+    parser.add_argument('--threshold', type=float, default=0.2, help="допустимое замедление медианы")
+    args = parser.parse_args(argv)
+
+    app = EducationalScheduleApp()
+    # Праздники и таблицы рабочих дней загружаются до замеров
+    app.working_calendar.preload(range(START_YEAR - 1, START_YEAR + 12))
+
+    results = {}
+    for group, name, func in build_cases(app):
+        if args.only and not any(pattern == group or pattern in name for pattern in args.only):
+            continue
+        result = measure(func, args.repeat, args.min_time)
+        result['group'] = group
+        results[name] = result
+        print(f"{name:<45} median {result['median_ms']:10.3f} ms   min {result['min_ms']:10.3f} ms")
+
+    report = {
+        'meta': {
+            'timestamp': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'repeat': args.repeat,
+        },
+        'results': results,
+    }
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+
+    if args.compare:
+        regressions = compare(results, args.compare, args.threshold)
+        if regressions:
+            print(f"Регрессии: {len(regressions)}")
+            return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
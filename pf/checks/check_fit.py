@@ -0,0 +1,166 @@
+"""Проверка корректности автоподбора недель (fit_period_weeks).
+
+Подобранные недели прогоняются через generate_schedule. Для типовых программ на каждый начальный год
+проверяется, что график укладывается в границы end_by и start_from, недели не меньше min_weeks,
+закреплённые строки не меняются, а число рабочих дней периода совпадает с int(недели * 5). На малых
+случайных программах отклонение сравнивается с перебором, заведомо несовместимые ограничения должны
+давать ValueError. При любой ошибке код возврата 1; замеры времени - в benchmarks/.
+
+Запуск из каталога pf:
+    python checks/check_fit.py
+    python checks/check_fit.py --years 2015-2035 --trials 200
+"""
+import argparse
+import itertools
+import os
+import random
+import sys
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from schedule_core import (  # noqa: E402
+    ACTIVITY_TYPES, EducationalScheduleApp, FitConstraints, POSTGRADUATE_EXAMPLE, RESIDENCY_EXAMPLE,
+)
+
+PROGRAMS = [("ординатура", RESIDENCY_EXAMPLE), ("аспирантура", POSTGRADUATE_EXAMPLE)]
+MIN_WEEKS_VARIANTS = [{}, {'ПА': 1, 'К': 4}, {'Т': 2, 'П': 2, 'ПА': 1.4, 'ГИА': 1, 'К': 6}]
+
+
+def constraint_errors(app, periods, fitted, start_year, constraints):
+    # Нарушения ограничений в графике, построенном по подобранным неделям
+    schedule = app.generate_schedule(fitted, start_year)
+    errors = []
+    if len(schedule) != len(periods):
+        return [f"периодов {len(schedule)} вместо {len(periods)}"]
+    for row_idx, date in constraints.end_by.items():
+        if schedule[row_idx].end_date > date:
+            errors.append(f"строка {row_idx + 1}: конец {schedule[row_idx].end_date:%d.%m.%Y} позже {date:%d.%m.%Y}")
+    for row_idx, date in constraints.start_from.items():
+        period = schedule[row_idx]
+        first_day = datetime.fromordinal(period.first_ordinal or period.start_ordinal)
+        if first_day < date:
+            errors.append(f"строка {row_idx + 1}: начало {first_day:%d.%m.%Y} раньше {date:%d.%m.%Y}")
+    for row_idx, (row, fitted_row, period) in enumerate(zip(periods, fitted, schedule)):
+        weeks = fitted_row['Недели']
+        if weeks < constraints.min_weeks.get(row['Тип'], 0) - 1e-9:
+            errors.append(f"строка {row_idx + 1}: {weeks} недель меньше минимума")
+        if row_idx in constraints.locked and weeks != row['Недели']:
+            errors.append(f"строка {row_idx + 1}: закреплённая строка изменена")
+        if period.day_count != int(weeks * 5):
+            errors.append(f"строка {row_idx + 1}: {period.day_count} рабочих дней вместо int({weeks} * 5)")
+    return errors
+
+
+def check_programs(app, years):
+    failures = []
+    cases = 0
+    for (name, periods), start_year, min_weeks, year_end, winter_break in itertools.product(
+            PROGRAMS, years, MIN_WEEKS_VARIANTS, (True, False), (True, False)):
+        constraints = app.academic_boundary_constraints(periods, start_year, year_end, winter_break)
+        constraints.min_weeks = min_weeks
+        # Первая строка каждого варианта закреплена
+        constraints.locked = {0}
+        label = f"{name} {start_year}, мин. {min_weeks}, границы {year_end}/{winter_break}"
+        cases += 1
+        try:
+            fitted = app.fit_period_weeks(periods, start_year, constraints)
+        except ValueError as exc:
+            failures.append(f"{label}: {exc}")
+            continue
+        failures.extend(f"{label}: {error}"
+                        for error in constraint_errors(app, periods, fitted, start_year, constraints))
+    return cases, failures
+
+
+def check_optimality(app, trials, seed):
+    # Малые программы: минимальное суммарное отклонение в днях сравнивается с полным перебором
+    rng = random.Random(seed)
+    failures = []
+    for _ in range(trials):
+        count = rng.randint(1, 3)
+        periods = [{"Год": 1, "Семестр": 1, "Тип": rng.choice(ACTIVITY_TYPES), "Недели": rng.randint(1, 10) / 5}
+                   for _ in range(count)]
+        start_year = rng.randint(2020, 2030)
+        constraints = FitConstraints(
+            end_by={count - 1: datetime(start_year, 9, 1) + timedelta(days=rng.randint(0, 25))},
+            max_weeks={activity_type: 1.6 for activity_type in ACTIVITY_TYPES})
+        if rng.random() < 0.5:
+            constraints.start_from = {count - 1: datetime(start_year, 9, 1) + timedelta(days=rng.randint(0, 20))}
+        targets = [int(row['Недели'] * 5) for row in periods]
+        label = f"{periods} {start_year} {constraints}"
+
+        best = None
+        for days in itertools.product(range(1, 9), repeat=count):
+            candidate = [{**row, 'Недели': n / 5} for row, n in zip(periods, days)]
+            if not constraint_errors(app, periods, candidate, start_year, constraints):
+                deviation = sum(abs(n - target) for n, target in zip(days, targets))
+                best = deviation if best is None else min(best, deviation)
+
+        try:
+            fitted = app.fit_period_weeks(periods, start_year, constraints)
+        except ValueError:
+            if best is not None:
+                failures.append(f"{label}: ValueError, а перебор нашёл отклонение {best}")
+            continue
+        errors = constraint_errors(app, periods, fitted, start_year, constraints)
+        deviation = sum(abs(int(row['Недели'] * 5) - target) for row, target in zip(fitted, targets))
+        if errors or deviation != best:
+            failures.append(f"{label}: отклонение {deviation}, перебор {best}, нарушения {errors}")
+    return trials, failures
+
+
+def check_infeasible(app):
+    # Ограничения, которые нельзя выполнить: подбор должен завершиться ValueError
+    start_year = 2025
+    boundaries = app.academic_boundary_constraints(RESIDENCY_EXAMPLE, start_year)
+    cases = [
+        ("минимум недель больше учебного года", RESIDENCY_EXAMPLE,
+         FitConstraints(min_weeks={'Т': 40}, end_by=boundaries.end_by, start_from=boundaries.start_from)),
+        ("первая строка начинается позже начала графика", RESIDENCY_EXAMPLE,
+         FitConstraints(start_from={0: datetime(start_year, 10, 1)})),
+        ("закреплённая строка не помещается до границы", [{"Год": 1, "Семестр": 1, "Тип": "Т", "Недели": 10}],
+         FitConstraints(end_by={0: datetime(start_year, 10, 1)}, locked={0})),
+        ("начало позже конца", [{"Год": 1, "Семестр": 1, "Тип": "Т", "Недели": 2},
+                                {"Год": 1, "Семестр": 1, "Тип": "П", "Недели": 2}],
+         FitConstraints(end_by={1: datetime(start_year, 9, 30)}, start_from={1: datetime(start_year, 10, 1)})),
+    ]
+    failures = []
+    for label, periods, constraints in cases:
+        try:
+            app.fit_period_weeks(periods, start_year, constraints)
+        except ValueError:
+            continue
+        failures.append(f"{label}: ожидалась ValueError")
+    return len(cases), failures
+
+
+def parse_years(value):
+    first, _, last = value.partition('-')
+    return range(int(first), int(last or first) + 1)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Проверка автоподбора недель")
+    parser.add_argument('--years', type=parse_years, default=parse_years('2020-2030'),
+                        help="начальные годы, например 2020-2030")
+    parser.add_argument('--trials', type=int, default=60, help="число случайных программ для перебора")
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args(argv)
+
+    app = EducationalScheduleApp()
+    failed = 0
+    for title, (cases, failures) in [
+        ("Типовые программы", check_programs(app, args.years)),
+        ("Оптимальность (перебор)", check_optimality(app, args.trials, args.seed)),
+        ("Несовместимые ограничения", check_infeasible(app)),
+    ]:
+        print(f"{title}: случаев {cases}, ошибок {len(failures)}")
+        for failure in failures:
+            print(f"  {failure}")
+        failed += len(failures)
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
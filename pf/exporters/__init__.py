@@ -0,0 +1,8 @@
+"""Экспорт учебного графика.
+
+    excel - книга xlsx через openpyxl (обычная и потоковая запись);
+    data  - iCalendar, CSV, Parquet и JSON-сводка для внешних систем.
+
+Модули импортируются методами EducationalScheduleApp при первом экспорте, поэтому расчёт графика
+не загружает openpyxl и pandas. Экспорт xlsx без openpyxl - в parallel_export.
+"""
@@ -0,0 +1,151 @@
+"""Экспорт графика как данных для внешних систем: iCalendar, CSV, Parquet и JSON-сводка.
+
+Файлы строятся прямо из списка периодов, без книги Excel. pandas нужен только для CSV и Parquet,
+pyarrow - только для Parquet.
+"""
+import json
+from datetime import datetime, timezone
+
+import numpy as np
+
+from metrics import METRICS
+from schedule_core import ACTIVITY_DESCRIPTIONS, schedule_content_hash
+
+
+def schedule_day_frame(app, generated_schedule):
+    # Длинная таблица "дата -> вид деятельности": по строке на каждый рабочий день графика
+    import pandas as pd
+
+    periods = [(idx, period) for idx, period in enumerate(generated_schedule) if period.day_count]
+    columns = ['Дата', 'Год', 'Семестр', 'Тип', 'Период']
+    if not periods:
+        return pd.DataFrame({name: [] for name in columns})
+
+    first_year = datetime.fromordinal(periods[0][1].first_ordinal).year
+    last_year = datetime.fromordinal(max(period.last_ordinal for _, period in periods)).year
+    base = datetime(first_year, 1, 1).toordinal()
+    working = np.concatenate([app.working_calendar.working_mask(year)
+                              for year in range(first_year, last_year + 1)])
+
+    period_ordinals = [
+        np.flatnonzero(working[period.first_ordinal - base:period.last_ordinal - base + 1]) + period.first_ordinal
+        for _, period in periods
+    ]
+    ordinals = np.concatenate(period_ordinals)
+    # Число строк периода берётся из маски, а не из period.day_count: если праздники переопределили
+    # после генерации графика, сохранённое число дней может не совпасть с текущим календарём
+    counts = [len(days) for days in period_ordinals]
+    epoch = datetime(1970, 1, 1).toordinal()
+
+    return pd.DataFrame({
+        'Дата': (ordinals - epoch).astype('datetime64[D]'),
+        'Год': np.repeat([period.year for _, period in periods], counts),
+        'Семестр': np.repeat([period.semester for _, period in periods], counts),
+        'Тип': np.repeat([period.type for _, period in periods], counts),
+        'Период': np.repeat([idx + 1 for idx, _ in periods], counts),
+    })
+
+
+@METRICS.timed('export.csv')
+def export_csv(app, generated_schedule, target):
+    schedule_day_frame(app, generated_schedule).to_csv(target, index=False, encoding='utf-8')
+
+
+@METRICS.timed('export.parquet')
+def export_parquet(app, generated_schedule, target):
+    # Требует pyarrow
+    schedule_day_frame(app, generated_schedule).to_parquet(target, index=False)
+
+
+@METRICS.timed('export.ics')
+def export_ics(generated_schedule, start_year, program_type, target):
+    # Календарь iCalendar: по событию на весь день для каждого периода, от первого до последнего рабочего дня
+    schedule_key = schedule_content_hash(generated_schedule, start_year, program_type)
+    stamp = datetime.now(timezone.utc).strftime('%Y%m%dT%H%M%SZ')
+    lines = [
+        'BEGIN:VCALENDAR',
+        'VERSION:2.0',
+        'PRODID:-//Учебный график//RU',
+        'CALSCALE:GREGORIAN',
+        f'X-WR-CALNAME:{ics_escape(f"{program_type}, {start_year}")}',
+    ]
+    for idx, period in enumerate(generated_schedule):
+        if not period.day_count:
+            continue
+        summary = f"{period.type} - {ACTIVITY_DESCRIPTIONS.get(period.type, period.type)}"
+        details = (f"Год {period.year}, семестр {period.semester}. "
+                   f"Недель: {period.weeks:.1f}, рабочих дней: {period.day_count}")
+        first_day = datetime.fromordinal(period.first_ordinal)
+        # DTEND в событиях на весь день не включается в событие
+        end_day = datetime.fromordinal(period.last_ordinal + 1)
+        lines += [
+            'BEGIN:VEVENT',
+            f'UID:{schedule_key[:16]}-{idx + 1}@schedule',
+            f'DTSTAMP:{stamp}',
+            f'DTSTART;VALUE=DATE:{first_day.strftime("%Y%m%d")}',
+            f'DTEND;VALUE=DATE:{end_day.strftime("%Y%m%d")}',
+            f'SUMMARY:{ics_escape(summary)}',
+            f'DESCRIPTION:{ics_escape(details)}',
+            f'CATEGORIES:{ics_escape(period.type)}',
+            'TRANSP:TRANSPARENT',
+            'END:VEVENT',
+        ]
+    lines.append('END:VCALENDAR')
+    write_bytes(target, ''.join(ics_fold(line) + '\r\n' for line in lines).encode('utf-8'))
+
+
+@METRICS.timed('export.json')
+def export_json(generated_schedule, start_year, program_type, target):
+    # Сводка: периоды с границами и итоги рабочих дней по видам деятельности и учебным годам
+    periods = []
+    totals = {}
+    for period in generated_schedule:
+        periods.append({
+            "Год": period.year,
+            "Семестр": period.semester,
+            "Тип": period.type,
+            "Недели": period.weeks,
+            "Начало": period.start_date.date().isoformat(),
+            "Конец": period.end_date.date().isoformat(),
+            "Дней": period.day_count
+        })
+        year_totals = totals.setdefault(str(period.year), {})
+        year_totals[period.type] = year_totals.get(period.type, 0) + period.day_count
+
+    summary = {
+        "Тип программы": program_type,
+        "Начальный год": start_year,
+        "Начало": periods[0]["Начало"] if periods else None,
+        "Конец": periods[-1]["Конец"] if periods else None,
+        "Рабочих дней": sum(period.day_count for period in generated_schedule),
+        "Дней по годам": totals,
+        "Периоды": periods
+    }
+    write_bytes(target, json.dumps(summary, ensure_ascii=False, indent=2).encode('utf-8'))
+
+
+def write_bytes(target, data):
+    # target - путь к файлу или двоичный поток
+    if hasattr(target, 'write'):
+        target.write(data)
+    else:
+        with open(target, 'wb') as f:
+            f.write(data)
+
+
+def ics_escape(text):
+    return (str(text).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\n', '\\n'))
+
+
+def ics_fold(line):
+    # Строки iCalendar длиннее 75 байт переносятся; продолжение начинается с пробела
+    parts = []
+    current = ''
+    for char in line:
+        if len((current + char).encode('utf-8')) > 75:
+            parts.append(current)
+            current = ' '
+        current += char
+    parts.append(current)
+    return '\r\n'.join(parts)
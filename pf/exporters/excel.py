@@ -0,0 +1,244 @@
+"""Экспорт графика в xlsx через openpyxl: обычная книга и потоковая запись (write_only).
+
+Модуль загружается при первом экспорте, поэтому openpyxl не нужен для расчёта графика.
+"""
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.styles import Font, PatternFill, Border, Side, Alignment, NamedStyle
+from openpyxl.styles.borders import DEFAULT_BORDER
+from openpyxl.styles.fonts import DEFAULT_FONT
+from openpyxl.utils import get_column_letter
+
+from metrics import METRICS
+from schedule_core import (
+    ACTIVITY_COLORS, ACTIVITY_DESCRIPTIONS, CELL_STYLE_KEYS, HOLIDAY_COLOR, PADDING_COLOR, WEEKEND_COLOR,
+)
+
+
+def solid_fill(color):
+    return PatternFill(start_color=color, end_color=color, fill_type="solid")
+
+
+@METRICS.timed('excel.build_workbook')
+def create_excel_file(app, generated_schedule, start_year, program_type):
+    wb = Workbook()
+    program_years = 2 if "Ординатура" in program_type else 3
+
+    # Стили регистрируются один раз на книгу
+    styles = register_calendar_styles(wb)
+
+    activity_index = app.get_activity_index(generated_schedule)
+
+    # Создать листы для каждого года
+    for academic_year in range(program_years):
+        actual_year = start_year + academic_year
+
+        if academic_year == 0:
+            ws = wb.active
+            ws.title = f"{actual_year}-{actual_year + 1}"
+        else:
+            ws = wb.create_sheet(f"{actual_year}-{actual_year + 1}")
+
+        create_academic_year_calendar(app, ws, actual_year, styles, activity_index)
+
+    # Лист с обозначениями
+    legend_ws = wb.create_sheet("Обозначения")
+    create_legend_sheet(legend_ws, styles)
+
+    return wb
+
+
+def create_academic_year_calendar(app, ws, start_year, styles, activity_index):
+    grid = app.compute_academic_year_grid(start_year, activity_index)
+
+    # Заголовок
+    ws.merge_cells('A1:AH1')
+    ws['A1'] = f"Календарный учебный график {start_year}-{start_year + 1} г."
+    ws['A1'].style = styles['title']
+
+    # Строка 2 - названия месяцев
+    for month, first_col, month_weeks in grid.month_spans():
+        col = first_col + 2
+        if month_weeks > 1:
+            ws.merge_cells(f'{get_column_letter(col)}2:{get_column_letter(col + month_weeks - 1)}2')
+        ws.cell(row=2, column=col, value=app.month_names_ru[month]).style = styles['header']
+
+    # Дни недели в первой колонке
+    days_of_week = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+    ws['A2'] = 'Мес'
+    ws['A2'].style = styles['header']
+
+    for row_idx, day_name in enumerate(days_of_week, 3):
+        ws.cell(row=row_idx, column=1, value=day_name).style = styles['header']
+
+    ws['A10'] = 'Нед'
+    ws['A10'].style = styles['header']
+
+    # Заполняем календарную сетку
+    cell_styles = [styles[key] for key in CELL_STYLE_KEYS]
+    for row_idx, (text_row, code_row) in enumerate(zip(grid.cell_texts(), grid.categories.tolist()), 3):
+        for col, (text, code) in enumerate(zip(text_row, code_row), 2):
+            ws.cell(row=row_idx, column=col, value=text).style = cell_styles[code]
+
+    # Номера недель
+    for col, week_number in enumerate(grid.week_numbers.tolist(), 2):
+        ws.cell(row=10, column=col, value=week_number).style = styles['day']
+
+    # Настройка размеров
+    ws.column_dimensions['A'].width = 6
+    for col in range(2, grid.columns + 2):
+        ws.column_dimensions[get_column_letter(col)].width = 5
+
+    for row in range(3, 10):
+        ws.row_dimensions[row].height = 25
+
+
+def create_legend_sheet(ws, styles):
+    ws['A1'] = "Условные обозначения"
+    ws['A1'].style = styles['legend_title']
+
+    ws['A3'] = "Типы занятий:"
+    ws['A3'].style = styles['legend_header']
+
+    activity_names = ['Т', 'П', 'ПА', 'ГИА', 'К']
+    activity_descriptions = [ACTIVITY_DESCRIPTIONS[name] for name in activity_names]
+
+    for i, name in enumerate(activity_names):
+        col = chr(66 + i)
+        ws[f'{col}4'] = name
+        ws[f'{col}4'].style = styles[f'legend_{name}']
+
+        ws[f'{col}5'] = activity_descriptions[i]
+        ws[f'{col}5'].style = styles['day']
+
+    ws['A7'] = "Прочие обозначения:"
+    ws['A7'].style = styles['legend_header']
+
+    ws['B8'] = "Выходные"
+    ws['B8'].style = styles['weekend']
+
+    ws['C8'] = "Праздники"
+    ws['C8'].style = styles['holiday']
+
+    for col_letter in ['A', 'B', 'C', 'D', 'E', 'F']:
+        ws.column_dimensions[col_letter].width = 20
+
+
+@METRICS.timed('excel.export_streaming')
+def export_excel_streaming(app, generated_schedule, start_year, program_type, target):
+    # Потоковый экспорт: openpyxl в режиме write_only пишет листы построчно, не держа сетку ячеек в памяти.
+    # target - путь к файлу или двоичный поток (файл, сокет, BytesIO)
+    wb = Workbook(write_only=True)
+    program_years = 2 if "Ординатура" in program_type else 3
+
+    styles = register_calendar_styles(wb)
+    activity_index = app.get_activity_index(generated_schedule)
+
+    for academic_year in range(program_years):
+        actual_year = start_year + academic_year
+        ws = wb.create_sheet(f"{actual_year}-{actual_year + 1}")
+        stream_academic_year_calendar(app, ws, actual_year, styles, activity_index)
+
+    legend_ws = wb.create_sheet("Обозначения")
+    stream_legend_sheet(legend_ws, styles)
+
+    wb.save(target)
+
+
+def register_calendar_styles(wb):
+    # Именованные стили регистрируются в книге один раз, ячейки ссылаются на них по имени
+    thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
+                         top=Side(style='thin'), bottom=Side(style='thin'))
+    center = Alignment(horizontal='center')
+    header_font = Font(bold=True)
+    title_font = Font(size=16, bold=True)
+
+    definitions = {
+        'title': dict(font=title_font, alignment=center),
+        'header': dict(font=header_font, alignment=center, border=thin_border),
+        'day': dict(alignment=center, border=thin_border),
+        'padding': dict(fill=solid_fill(PADDING_COLOR), border=thin_border),
+        'weekend': dict(fill=solid_fill(WEEKEND_COLOR), alignment=center, border=thin_border),
+        'holiday': dict(fill=solid_fill(HOLIDAY_COLOR), alignment=center, border=thin_border),
+        'legend_title': dict(font=title_font),
+        'legend_header': dict(font=header_font),
+    }
+    for name, color in ACTIVITY_COLORS.items():
+        definitions[f'activity_{name}'] = dict(
+            font=Font(size=9), fill=solid_fill(color), border=thin_border,
+            alignment=Alignment(horizontal='center', vertical='center')
+        )
+        definitions[f'legend_{name}'] = dict(font=header_font, fill=solid_fill(color),
+                                             alignment=center, border=thin_border)
+
+    styles = {}
+    for key, attrs in definitions.items():
+        # Незаданные шрифт и рамка берутся из стандартных стилей книги, чтобы не плодить дубликаты
+        attrs.setdefault('font', DEFAULT_FONT)
+        attrs.setdefault('border', DEFAULT_BORDER)
+        style = NamedStyle(name=f'calendar_{key}', **attrs)
+        wb.add_named_style(style)
+        styles[key] = style.name
+    return styles
+
+
+def styled_cell(ws, value, style_name):
+    cell = WriteOnlyCell(ws, value=value)
+    cell.style = style_name
+    return cell
+
+
+def stream_academic_year_calendar(app, ws, start_year, styles, activity_index):
+    grid = app.compute_academic_year_grid(start_year, activity_index)
+
+    # Размеры и объединения задаются до записи строк: заголовок листа уходит в поток с первой строкой
+    ws.column_dimensions['A'].width = 6
+    for col in range(2, grid.columns + 2):
+        ws.column_dimensions[get_column_letter(col)].width = 5
+    for row in range(3, 10):
+        ws.row_dimensions[row].height = 25
+
+    ws.merged_cells.add('A1:AH1')
+    ws.append([styled_cell(ws, f"Календарный учебный график {start_year}-{start_year + 1} г.", styles['title'])])
+
+    # Строка 2 - названия месяцев
+    month_row = [styled_cell(ws, 'Мес', styles['header'])]
+    for month, first_col, month_weeks in grid.month_spans():
+        col = first_col + 2
+        if month_weeks > 1:
+            ws.merged_cells.add(f'{get_column_letter(col)}2:{get_column_letter(col + month_weeks - 1)}2')
+        month_row.append(styled_cell(ws, app.month_names_ru[month], styles['header']))
+        month_row.extend([None] * (month_weeks - 1))
+    ws.append(month_row)
+
+    # Строки 3-9 - дни недели
+    days_of_week = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+    cell_styles = [styles[key] for key in CELL_STYLE_KEYS]
+    for day_name, text_row, code_row in zip(days_of_week, grid.cell_texts(), grid.categories.tolist()):
+        ws.append([styled_cell(ws, day_name, styles['header'])] +
+                  [styled_cell(ws, text, cell_styles[code]) for text, code in zip(text_row, code_row)])
+
+    # Строка 10 - номера недель
+    ws.append([styled_cell(ws, 'Нед', styles['header'])] +
+              [styled_cell(ws, week_number, styles['day']) for week_number in grid.week_numbers.tolist()])
+
+
+def stream_legend_sheet(ws, styles):
+    for col_letter in ['A', 'B', 'C', 'D', 'E', 'F']:
+        ws.column_dimensions[col_letter].width = 20
+
+    activity_names = ['Т', 'П', 'ПА', 'ГИА', 'К']
+    activity_descriptions = [ACTIVITY_DESCRIPTIONS[name] for name in activity_names]
+
+    ws.append([styled_cell(ws, "Условные обозначения", styles['legend_title'])])
+    ws.append([])
+    ws.append([styled_cell(ws, "Типы занятий:", styles['legend_header'])])
+    ws.append([None] + [styled_cell(ws, name, styles[f'legend_{name}']) for name in activity_names])
+    ws.append([None] + [styled_cell(ws, description, styles['day'])
+                        for description in activity_descriptions])
+    ws.append([])
+    ws.append([styled_cell(ws, "Прочие обозначения:", styles['legend_header'])])
+    ws.append([None,
+               styled_cell(ws, "Выходные", styles['weekend']),
+               styled_cell(ws, "Праздники", styles['holiday'])])
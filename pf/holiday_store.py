@@ -0,0 +1,149 @@
+"""Общее хранилище праздничных дней для всех экземпляров приложения.
+
+Праздники хранятся по годам как карта дней (по байту на день года) и берутся из пакета
+holidays при первом обращении к году либо из заранее сохранённого файла, который читается
+без импорта holidays. Поверх них применяются локальные правки: дополнительные нерабочие
+дни вуза и рабочие дни, отменяющие праздник.
+
+Файл готовится командой
+    python holiday_store.py 2020 2040 -o holidays_ru.json
+и подхватывается при запуске из пути в переменной SCHEDULE_HOLIDAYS_FILE
+(по умолчанию holidays_ru.json рядом с модулем).
+"""
+import argparse
+import calendar
+import json
+import os
+from datetime import date
+
+from metrics import METRICS
+
+HOLIDAYS_FILE_ENV = 'SCHEDULE_HOLIDAYS_FILE'
+DEFAULT_HOLIDAYS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'holidays_ru.json')
+
+
+class HolidayStore:
+    def __init__(self, country='RU'):
+        self.country = country
+        # Год -> номера праздничных дней года (0 - 1 января) из пакета holidays или файла
+        self._base = {}
+        # Год -> (ординал 1 января, карта дней с учётом правок)
+        self._maps = {}
+        # Локальные правки по ординалам дат
+        self._days_off = set()
+        self._working_days = set()
+        # Увеличивается при каждом изменении, чтобы зависимые кеши знали о пересчёте
+        self.version = 0
+
+    def _load_year(self, year):
+        METRICS.count('holidays.package_load')
+        try:
+            import holidays  # type: ignore
+            country_holidays = holidays.country_holidays(self.country, years=year)
+            first = date(year, 1, 1).toordinal()
+            return sorted(day.toordinal() - first for day in country_holidays.keys())
+        except Exception:
+            # Если зависимости нет или ошибка, праздников нет
+            return []
+
+    def _year_entry(self, year):
+        entry = self._maps.get(year)
+        if entry is not None:
+            if METRICS.enabled:
+                METRICS.count('holidays.hit')
+        else:
+            METRICS.count('holidays.miss')
+            if year not in self._base:
+                self._base[year] = self._load_year(year)
+
+            first = date(year, 1, 1).toordinal()
+            days_in_year = 366 if calendar.isleap(year) else 365
+            year_map = bytearray(days_in_year)
+            for idx in self._base[year]:
+                year_map[idx] = 1
+            for ordinal in self._days_off:
+                if 0 <= ordinal - first < days_in_year:
+                    year_map[ordinal - first] = 1
+            for ordinal in self._working_days:
+                if 0 <= ordinal - first < days_in_year:
+                    year_map[ordinal - first] = 0
+
+            entry = (first, bytes(year_map))
+            self._maps[year] = entry
+        return entry
+
+    def year_map(self, year):
+        return self._year_entry(year)[1]
+
+    def is_holiday(self, day):
+        first, year_map = self._year_entry(day.year)
+        return year_map[day.toordinal() - first] == 1
+
+    def preload(self, years):
+        for year in years:
+            self._year_entry(year)
+
+    def override(self, days_off=(), working_days=()):
+        # Нерабочие дни вуза и отменённые праздники; дни задаются date/datetime или строкой YYYY-MM-DD
+        self._days_off.update(to_ordinal(day) for day in days_off)
+        self._working_days.update(to_ordinal(day) for day in working_days)
+        self._maps.clear()
+        self.version += 1
+
+    def save(self, path, years):
+        for year in years:
+            if year not in self._base:
+                self._base[year] = self._load_year(year)
+        data = {
+            'country': self.country,
+            'years': {str(year): self._base[year] for year in sorted(years)},
+            'days_off': sorted(date.fromordinal(o).isoformat() for o in self._days_off),
+            'working_days': sorted(date.fromordinal(o).isoformat() for o in self._working_days),
+        }
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump(data, f, ensure_ascii=False, separators=(',', ':'))
+
+    def load(self, path):
+        with open(path, encoding='utf-8') as f:
+            data = json.load(f)
+        self.country = data.get('country', self.country)
+        self._base.update({int(year): list(days) for year, days in data.get('years', {}).items()})
+        self.override(days_off=data.get('days_off', ()), working_days=data.get('working_days', ()))
+
+    @classmethod
+    def from_environment(cls):
+        store = cls()
+        path = os.environ.get(HOLIDAYS_FILE_ENV, DEFAULT_HOLIDAYS_FILE)
+        if os.path.exists(path):
+            store.load(path)
+        return store
+
+
+def to_ordinal(day):
+    if isinstance(day, str):
+        day = date.fromisoformat(day)
+    return day.toordinal()
+
+
+# Хранилище процесса: общее для всех сессий и экземпляров EducationalScheduleApp
+HOLIDAY_STORE = HolidayStore.from_environment()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Сохранить праздники за диапазон лет в файл")
+    parser.add_argument('first_year', type=int)
+    parser.add_argument('last_year', type=int)
+    parser.add_argument('-o', '--output', default=DEFAULT_HOLIDAYS_FILE)
+    parser.add_argument('--country', default='RU')
+    parser.add_argument('--day-off', action='append', default=[], help="дополнительный нерабочий день YYYY-MM-DD")
+    parser.add_argument('--working-day', action='append', default=[], help="рабочий день вместо праздника YYYY-MM-DD")
+    args = parser.parse_args(argv)
+
+    store = HolidayStore(args.country)
+    store.override(days_off=args.day_off, working_days=args.working_day)
+    store.save(args.output, range(args.first_year, args.last_year + 1))
+    print(f"Сохранено {args.last_year - args.first_year + 1} лет в {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,102 @@
+"""Лёгкие замеры горячих путей: таймеры и счётчики процесса.
+
+Включаются переменной окружения SCHEDULE_METRICS=1 (или METRICS.enabled = True). В выключенном
+состоянии таймер - общий пустой контекстный менеджер, а счётчики - одна проверка флага.
+При включённом логгере schedule.metrics каждый замер пишется строкой JSON.
+"""
+import json
+import logging
+import os
+import threading
+import time
+from contextlib import nullcontext
+from functools import wraps
+
+logger = logging.getLogger('schedule.metrics')
+
+_NULL_TIMER = nullcontext()
+
+
+class _Timer:
+    __slots__ = ('metrics', 'name', 'started')
+
+    def __init__(self, metrics, name):
+        self.metrics = metrics
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self.metrics.record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+class Metrics:
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        # Имя -> [число вызовов, суммарное время, максимум, последнее значение] в секундах
+        self._timers = {}
+        self._counters = {}
+
+    def timer(self, name):
+        if not self.enabled:
+            return _NULL_TIMER
+        return _Timer(self, name)
+
+    def timed(self, name):
+        # Декоратор: замер всего вызова функции
+        def decorator(func):
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                if not self.enabled:
+                    return func(*args, **kwargs)
+                with _Timer(self, name):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorator
+
+    def record(self, name, seconds):
+        with self._lock:
+            stats = self._timers.get(name)
+            if stats is None:
+                self._timers[name] = [1, seconds, seconds, seconds]
+            else:
+                stats[0] += 1
+                stats[1] += seconds
+                stats[2] = max(stats[2], seconds)
+                stats[3] = seconds
+        if logger.isEnabledFor(logging.INFO):
+            logger.info(json.dumps({'metric': name, 'ms': round(seconds * 1000, 3)}))
+
+    def count(self, name, value=1):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                'timers': {
+                    name: {
+                        'count': count,
+                        'total_ms': total * 1000,
+                        'mean_ms': total / count * 1000,
+                        'max_ms': longest * 1000,
+                        'last_ms': last * 1000,
+                    }
+                    for name, (count, total, longest, last) in self._timers.items()
+                },
+                'counters': dict(self._counters),
+            }
+
+    def reset(self):
+        with self._lock:
+            self._timers.clear()
+            self._counters.clear()
+
+
+METRICS = Metrics(enabled=os.environ.get('SCHEDULE_METRICS') == '1')
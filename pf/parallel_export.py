@@ -0,0 +1,278 @@
+"""Экспорт в xlsx с параллельной подготовкой листов учебных лет.
+
+Листы независимы, поэтому сетка каждого года считается и сериализуется в XML листа
+в отдельном процессе; основной процесс только собирает части в zip-архив xlsx.
+Ячейки пишутся inline-строками и числами со стилями из фиксированной таблицы, openpyxl
+для этого пути не нужен. Вид листов совпадает с create_excel_file.
+"""
+import os
+import zipfile
+from concurrent.futures import ProcessPoolExecutor
+from xml.sax.saxutils import escape, quoteattr
+
+from schedule_core import (
+    ACTIVITY_COLORS, ACTIVITY_DESCRIPTIONS, ACTIVITY_TYPES, CELL_STYLE_KEYS, HOLIDAY_COLOR, PADDING_COLOR,
+    WEEKEND_COLOR, ActivityIndex, worker_app,
+)
+
+MAIN_NS = "http://schemas.openxmlformats.org/spreadsheetml/2006/main"
+REL_NS = "http://schemas.openxmlformats.org/officeDocument/2006/relationships"
+PACKAGE_REL_NS = "http://schemas.openxmlformats.org/package/2006/relationships"
+SHEET_TYPE = "application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"
+
+DAYS_OF_WEEK = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
+
+# Шрифты: 0 - стандартный, 1 - заголовок листа, 2 - жирный, 3 - обозначения в ячейках
+FONTS = [
+    '<font><sz val="11"/><color theme="1"/><name val="Calibri"/><family val="2"/><scheme val="minor"/></font>',
+    '<font><b val="1"/><sz val="16"/></font>',
+    '<font><b val="1"/></font>',
+    '<font><sz val="9"/></font>',
+]
+FILL_COLORS = [PADDING_COLOR, WEEKEND_COLOR, HOLIDAY_COLOR] + [ACTIVITY_COLORS[name] for name in ACTIVITY_TYPES]
+# Первые две заливки зарезервированы форматом
+FILLS = ['<fill><patternFill/></fill>', '<fill><patternFill patternType="gray125"/></fill>'] + [
+    f'<fill><patternFill patternType="solid"><fgColor rgb="00{color}"/><bgColor rgb="00{color}"/></patternFill></fill>'
+    for color in FILL_COLORS
+]
+BORDERS = [
+    '<border><left/><right/><top/><bottom/><diagonal/></border>',
+    '<border><left style="thin"/><right style="thin"/><top style="thin"/><bottom style="thin"/><diagonal/></border>',
+]
+
+
+def fill_id(color):
+    return 2 + FILL_COLORS.index(color)
+
+
+# Ключ стиля -> (шрифт, заливка, рамка, выравнивание); ключи те же, что у register_calendar_styles
+STYLE_SPECS = {
+    'default': (0, 0, 0, None),
+    'title': (1, 0, 0, 'center'),
+    'header': (2, 0, 1, 'center'),
+    'day': (0, 0, 1, 'center'),
+    'padding': (0, fill_id(PADDING_COLOR), 1, None),
+    'weekend': (0, fill_id(WEEKEND_COLOR), 1, 'center'),
+    'holiday': (0, fill_id(HOLIDAY_COLOR), 1, 'center'),
+    'legend_title': (1, 0, 0, None),
+    'legend_header': (2, 0, 0, None),
+}
+for _name in ACTIVITY_TYPES:
+    STYLE_SPECS[f'activity_{_name}'] = (3, fill_id(ACTIVITY_COLORS[_name]), 1, 'center-center')
+    STYLE_SPECS[f'legend_{_name}'] = (2, fill_id(ACTIVITY_COLORS[_name]), 1, 'center')
+
+STYLE_IDS = {key: idx for idx, key in enumerate(STYLE_SPECS)}
+
+def column_letter(col):
+    letters = ''
+    while col:
+        col, remainder = divmod(col - 1, 26)
+        letters = chr(65 + remainder) + letters
+    return letters
+
+
+def styles_xml():
+    xfs = []
+    for font, fill, border, alignment in STYLE_SPECS.values():
+        attrs = f'numFmtId="0" fontId="{font}" fillId="{fill}" borderId="{border}" xfId="0"'
+        attrs += ''.join(f' apply{name}="1"' for name, used in
+                         (('Font', font), ('Fill', fill), ('Border', border), ('Alignment', alignment)) if used)
+        if alignment == 'center':
+            xfs.append(f'<xf {attrs}><alignment horizontal="center"/></xf>')
+        elif alignment == 'center-center':
+            xfs.append(f'<xf {attrs}><alignment horizontal="center" vertical="center"/></xf>')
+        else:
+            xfs.append(f'<xf {attrs}/>')
+    return (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        f'<styleSheet xmlns="{MAIN_NS}">'
+        f'<fonts count="{len(FONTS)}">{"".join(FONTS)}</fonts>'
+        f'<fills count="{len(FILLS)}">{"".join(FILLS)}</fills>'
+        f'<borders count="{len(BORDERS)}">{"".join(BORDERS)}</borders>'
+        f'<cellStyleXfs count="1"><xf numFmtId="0" fontId="0" fillId="0" borderId="0"/></cellStyleXfs>'
+        f'<cellXfs count="{len(xfs)}">{"".join(xfs)}</cellXfs>'
+        f'<cellStyles count="1"><cellStyle name="Normal" xfId="0" builtinId="0"/></cellStyles>'
+        f'</styleSheet>'
+    )
+
+
+def cell_xml(ref, value, style_key):
+    style = STYLE_IDS[style_key]
+    if value is None or value == "":
+        return f'<c r="{ref}" s="{style}"/>'
+    if isinstance(value, int):
+        return f'<c r="{ref}" s="{style}"><v>{value}</v></c>'
+    return f'<c r="{ref}" s="{style}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+
+
+def sheet_xml(rows, column_widths, row_heights, merged):
+    # rows: {номер строки: [(номер столбца, значение, ключ стиля), ...]}
+    parts = [f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><worksheet xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">',
+             '<sheetViews><sheetView workbookViewId="0"/></sheetViews>',
+             '<sheetFormatPr baseColWidth="8" defaultRowHeight="15"/>']
+    if column_widths:
+        parts.append('<cols>')
+        parts.extend(f'<col min="{col}" max="{col}" width="{width}" customWidth="1"/>'
+                     for first, last, width in column_widths for col in range(first, last + 1))
+        parts.append('</cols>')
+
+    parts.append('<sheetData>')
+    for row_idx in sorted(rows):
+        height = row_heights.get(row_idx)
+        row_attrs = f' ht="{height}" customHeight="1"' if height else ''
+        parts.append(f'<row r="{row_idx}"{row_attrs}>')
+        parts.extend(cell_xml(f'{column_letter(col)}{row_idx}', value, style) for col, value, style in rows[row_idx])
+        parts.append('</row>')
+    parts.append('</sheetData>')
+
+    if merged:
+        parts.append(f'<mergeCells count="{len(merged)}">')
+        parts.extend(f'<mergeCell ref="{ref}"/>' for ref in merged)
+        parts.append('</mergeCells>')
+    parts.append('<pageMargins left="0.75" right="0.75" top="1" bottom="1" header="0.5" footer="0.5"/></worksheet>')
+    return ''.join(parts).encode('utf-8')
+
+
+def year_sheet_xml(app, start_year, activity_index):
+    grid = app.compute_academic_year_grid(start_year, activity_index)
+    last_col = grid.columns + 1
+
+    rows = {1: [(1, f"Календарный учебный график {start_year}-{start_year + 1} г.", 'title')]}
+    merged = ['A1:AH1']
+
+    month_row = [(1, 'Мес', 'header')]
+    for month, first_col, month_weeks in grid.month_spans():
+        col = first_col + 2
+        if month_weeks > 1:
+            merged.append(f'{column_letter(col)}2:{column_letter(col + month_weeks - 1)}2')
+        month_row.append((col, app.month_names_ru[month], 'header'))
+    rows[2] = month_row
+
+    for row_idx, (day_name, text_row, code_row) in enumerate(
+            zip(DAYS_OF_WEEK, grid.cell_texts(), grid.categories.tolist()), 3):
+        rows[row_idx] = [(1, day_name, 'header')] + [
+            (col, text, CELL_STYLE_KEYS[code]) for col, (text, code) in enumerate(zip(text_row, code_row), 2)
+        ]
+
+    rows[10] = [(1, 'Нед', 'header')] + [
+        (col, week_number, 'day') for col, week_number in enumerate(grid.week_numbers.tolist(), 2)
+    ]
+
+    return sheet_xml(rows, [(1, 1, 6), (2, last_col, 5)], {row: 25 for row in range(3, 10)}, merged)
+
+
+def legend_sheet_xml():
+    activity_descriptions = [ACTIVITY_DESCRIPTIONS[name] for name in ACTIVITY_TYPES]
+    rows = {
+        1: [(1, "Условные обозначения", 'legend_title')],
+        3: [(1, "Типы занятий:", 'legend_header')],
+        4: [(2 + i, name, f'legend_{name}') for i, name in enumerate(ACTIVITY_TYPES)],
+        5: [(2 + i, description, 'day') for i, description in enumerate(activity_descriptions)],
+        7: [(1, "Прочие обозначения:", 'legend_header')],
+        8: [(2, "Выходные", 'weekend'), (3, "Праздники", 'holiday')],
+    }
+    return sheet_xml(rows, [(1, 6, 20)], {}, [])
+
+
+def render_year_sheet(start_year, generated_schedule):
+    # Выполняется в процессе-обработчике
+    return year_sheet_xml(worker_app(), start_year, ActivityIndex(generated_schedule))
+
+
+def write_xlsx(target, sheets):
+    # sheets: [(название листа, XML листа)]
+    content_types = (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+        '<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+        '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+        '<Default Extension="xml" ContentType="application/xml"/>'
+        '<Override PartName="/xl/workbook.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+        '<Override PartName="/xl/styles.xml" '
+        'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.styles+xml"/>'
+        + ''.join(f'<Override PartName="/xl/worksheets/sheet{i}.xml" ContentType="{SHEET_TYPE}"/>'
+                  for i in range(1, len(sheets) + 1))
+        + '</Types>'
+    )
+    root_rels = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{PACKAGE_REL_NS}">'
+        f'<Relationship Id="rId1" Type="{REL_NS}/officeDocument" Target="xl/workbook.xml"/></Relationships>'
+    )
+    workbook = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><workbook xmlns="{MAIN_NS}" xmlns:r="{REL_NS}">'
+        f'<bookViews><workbookView activeTab="0"/></bookViews><sheets>'
+        + ''.join(f'<sheet name={quoteattr(title)} sheetId="{i}" r:id="rId{i}"/>'
+                  for i, (title, _) in enumerate(sheets, 1))
+        + '</sheets></workbook>'
+    )
+    workbook_rels = (
+        f'<?xml version="1.0" encoding="UTF-8" standalone="yes"?><Relationships xmlns="{PACKAGE_REL_NS}">'
+        + ''.join(f'<Relationship Id="rId{i}" Type="{REL_NS}/worksheet" Target="worksheets/sheet{i}.xml"/>'
+                  for i in range(1, len(sheets) + 1))
+        + f'<Relationship Id="rId{len(sheets) + 1}" Type="{REL_NS}/styles" Target="styles.xml"/></Relationships>'
+    )
+
+    with zipfile.ZipFile(target, 'w', zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr('[Content_Types].xml', content_types)
+        archive.writestr('_rels/.rels', root_rels)
+        archive.writestr('xl/workbook.xml', workbook)
+        archive.writestr('xl/_rels/workbook.xml.rels', workbook_rels)
+        archive.writestr('xl/styles.xml', styles_xml())
+        for i, (_, xml) in enumerate(sheets, 1):
+            archive.writestr(f'xl/worksheets/sheet{i}.xml', xml)
+
+
+def sheet_title(prefix, start_year, suffix=''):
+    # Excel ограничивает название листа 31 символом и запрещает часть знаков; учебный год не обрезается
+    for char in '[]:*?/\\':
+        prefix = prefix.replace(char, '_')
+    year_part = f"{suffix}{start_year}-{start_year + 1}"
+    return prefix[:31 - len(year_part)] + year_part
+
+
+def export_programs_parallel(programs, target, executor=None, max_workers=None):
+    """Одна книга на несколько программ: programs - [(префикс листов, график, начальный год, тип программы)].
+
+    executor - готовый пул процессов; без него пул на max_workers процессов создаётся на время вызова,
+    а при max_workers=1 листы готовятся в текущем процессе.
+    """
+    jobs = []
+    titles = set()
+    for prefix, generated_schedule, start_year, program_type in programs:
+        program_years = 2 if "Ординатура" in program_type else 3
+        actual_years = [start_year + academic_year for academic_year in range(program_years)]
+        # Названия листов в книге должны быть уникальны. Номер выбирается один на программу и проверяется
+        # по всем её листам, чтобы листы одной программы не получили разные префиксы
+        program_titles = [sheet_title(prefix, year) for year in actual_years]
+        suffix = 1
+        while any(title.lower() in titles for title in program_titles):
+            suffix += 1
+            program_titles = [sheet_title(prefix, year, f"~{suffix} ") for year in actual_years]
+        for title, actual_year in zip(program_titles, actual_years):
+            titles.add(title.lower())
+            jobs.append((title, actual_year, list(generated_schedule)))
+
+    workers = max_workers or min(len(jobs), os.cpu_count() or 1)
+    if executor is None and workers <= 1:
+        # Без пула: листы готовятся в текущем процессе тем же кодом
+        sheets = [(title, render_year_sheet(year, schedule)) for title, year, schedule in jobs]
+    else:
+        own_executor = executor is None
+        if own_executor:
+            executor = ProcessPoolExecutor(max_workers=workers)
+        try:
+            futures = [(title, executor.submit(render_year_sheet, year, schedule)) for title, year, schedule in jobs]
+            sheets = [(title, future.result()) for title, future in futures]
+        finally:
+            if own_executor:
+                executor.shutdown()
+
+    sheets.append(("Обозначения", legend_sheet_xml()))
+    write_xlsx(target, sheets)
+
+
+def export_excel_parallel(generated_schedule, start_year, program_type, target, executor=None, max_workers=1):
+    # Листы одной программы по умолчанию готовятся в текущем процессе: XML 2-3 листов строится быстрее,
+    # чем запускается пул. Пул используется, если передан executor или явно задан max_workers
+    export_programs_parallel([("", generated_schedule, start_year, program_type)], target,
+                             executor=executor, max_workers=max_workers)
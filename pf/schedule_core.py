@@ -0,0 +1,696 @@
+"""Ядро расчёта учебного графика: рабочие дни, праздники, периоды графика и календарная сетка.
+
+Модуль не зависит от Streamlit, openpyxl и pandas: таблицу периодов можно передать списком словарей
+с ключами Год, Семестр, Тип, Недели (или DataFrame). Экспорт подключается из пакета exporters
+при первом вызове методов экспорта.
+"""
+from datetime import datetime, timedelta
+from bisect import bisect_left, bisect_right
+from array import array
+import calendar
+import math
+import hashlib
+from dataclasses import dataclass, field
+import numpy as np
+from holiday_store import HOLIDAY_STORE
+from metrics import METRICS
+
+# Цвета обозначений в Excel
+ACTIVITY_COLORS = {
+    'Т': "90EE90",
+    'П': "87CEEB",
+    'ПА': "FFE4B5",
+    'ГИА': "DDA0DD",
+    'К': "F0E68C"
+}
+# Расшифровка видов деятельности
+ACTIVITY_DESCRIPTIONS = {
+    'Т': 'Теоретическая подготовка',
+    'П': 'Практика',
+    'ПА': 'Промежуточная аттестация',
+    'ГИА': 'Государственная итоговая аттестация',
+    'К': 'Каникулы'
+}
+WEEKEND_COLOR = "E6E6FA"
+HOLIDAY_COLOR = "FFB6C1"
+PADDING_COLOR = "F5F5F5"
+
+# Коды ячеек календарной сетки; виды деятельности кодируются как CELL_ACTIVITY + номер в ACTIVITY_TYPES
+CELL_PADDING = 0
+CELL_DAY = 1
+CELL_WEEKEND = 2
+CELL_HOLIDAY = 3
+CELL_ACTIVITY = 4
+ACTIVITY_TYPES = list(ACTIVITY_COLORS)
+
+# Ключи стилей для кодов ячеек (индекс = код)
+CELL_STYLE_KEYS = ['padding', 'day', 'weekend', 'holiday'] + [f'activity_{name}' for name in ACTIVITY_TYPES]
+
+# Примеры программ для быстрого заполнения
+RESIDENCY_EXAMPLE = [
+    {"Год": 1, "Семестр": 1, "Тип": "Т", "Недели": 10},
+    {"Год": 1, "Семестр": 1, "Тип": "П", "Недели": 12},
+    {"Год": 1, "Семестр": 1, "Тип": "ПА", "Недели": 1},
+    {"Год": 1, "Семестр": 2, "Тип": "Т", "Недели": 4},
+    {"Год": 1, "Семестр": 2, "Тип": "П", "Недели": 16},
+    {"Год": 1, "Семестр": 2, "Тип": "ПА", "Недели": 1},
+    {"Год": 1, "Семестр": 2, "Тип": "К", "Недели": 6},
+    {"Год": 2, "Семестр": 1, "Тип": "Т", "Недели": 10},
+    {"Год": 2, "Семестр": 1, "Тип": "П", "Недели": 12},
+    {"Год": 2, "Семестр": 1, "Тип": "ПА", "Недели": 1},
+    {"Год": 2, "Семестр": 2, "Тип": "Т", "Недели": 9},
+    {"Год": 2, "Семестр": 2, "Тип": "П", "Недели": 8},
+    {"Год": 2, "Семестр": 2, "Тип": "ПА", "Недели": 1},
+    {"Год": 2, "Семестр": 2, "Тип": "ГИА", "Недели": 2},
+    {"Год": 2, "Семестр": 2, "Тип": "К", "Недели": 6}
+]
+
+POSTGRADUATE_EXAMPLE = [
+    # Год 1
+    {"Год": 1, "Семестр": 1, "Тип": "Т", "Недели": 12},
+    {"Год": 1, "Семестр": 1, "Тип": "П", "Недели": 12},
+    {"Год": 1, "Семестр": 1, "Тип": "ПА", "Недели": 2},
+    {"Год": 1, "Семестр": 2, "Тип": "Т", "Недели": 8},
+    {"Год": 1, "Семестр": 2, "Тип": "П", "Недели": 12},
+    {"Год": 1, "Семестр": 2, "Тип": "ПА", "Недели": 2},
+    {"Год": 1, "Семестр": 2, "Тип": "К", "Недели": 4},
+    # Год 2
+    {"Год": 2, "Семестр": 1, "Тип": "Т", "Недели": 10},
+    {"Год": 2, "Семестр": 1, "Тип": "П", "Недели": 14},
+    {"Год": 2, "Семестр": 1, "Тип": "ПА", "Недели": 2},
+    {"Год": 2, "Семестр": 2, "Тип": "Т", "Недели": 6},
+    {"Год": 2, "Семестр": 2, "Тип": "П", "Недели": 14},
+    {"Год": 2, "Семестр": 2, "Тип": "ПА", "Недели": 2},
+    {"Год": 2, "Семестр": 2, "Тип": "К", "Недели": 4},
+    # Год 3
+    {"Год": 3, "Семестр": 1, "Тип": "Т", "Недели": 6},
+    {"Год": 3, "Семестр": 1, "Тип": "П", "Недели": 16},
+    {"Год": 3, "Семестр": 1, "Тип": "ПА", "Недели": 2},
+    {"Год": 3, "Семестр": 2, "Тип": "Т", "Недели": 4},
+    {"Год": 3, "Семестр": 2, "Тип": "П", "Недели": 12},
+    {"Год": 3, "Семестр": 2, "Тип": "ГИА", "Недели": 4},
+    {"Год": 3, "Семестр": 2, "Тип": "К", "Недели": 6}
+]
+
+
+class WorkingDayCalendar:
+    """Рабочие дни по годам: префиксные суммы рабочих дней для арифметики без перебора."""
+
+    def __init__(self, holiday_store):
+        self.holidays = holiday_store
+        # Год -> (ординал 1 января, префиксные суммы рабочих дней)
+        self._years = {}
+        self._holidays_version = holiday_store.version
+
+    def _year_table(self, year):
+        if self._holidays_version != self.holidays.version:
+            # Праздники изменились (локальные правки) - таблицы пересчитываются
+            self._years = {}
+            self._holidays_version = self.holidays.version
+
+        table = self._years.get(year)
+        if table is None:
+            first = datetime(year, 1, 1)
+            first_weekday = first.weekday()
+            # prefix[i] - число рабочих дней среди первых i дней года
+            prefix = array('H', [0])
+            count = 0
+            for idx, is_holiday in enumerate(self.holidays.year_map(year)):
+                if not is_holiday and (first_weekday + idx) % 7 < 5:
+                    count += 1
+                prefix.append(count)
+            table = (first.toordinal(), prefix)
+            self._years[year] = table
+        return table
+
+    def preload(self, years):
+        # Заранее строит таблицы (и загружает праздники) для диапазона лет
+        for year in years:
+            self._year_table(year)
+
+    def holiday_map(self, year):
+        return self.holidays.year_map(year)
+
+    def working_mask(self, year):
+        # Массив по дням года: True для рабочих дней
+        prefix = np.frombuffer(self._year_table(year)[1], dtype=np.uint16)
+        return np.diff(prefix) != 0
+
+    def is_working_day(self, date):
+        first, prefix = self._year_table(date.year)
+        idx = date.toordinal() - first
+        return prefix[idx + 1] != prefix[idx]
+
+    def count_working_days(self, start_date, end_date):
+        # Число рабочих дней в полуинтервале [start_date, end_date)
+        if end_date <= start_date:
+            return 0
+        total = 0
+        for year in range(start_date.year, end_date.year + 1):
+            first, prefix = self._year_table(year)
+            lo = max(start_date.toordinal() - first, 0)
+            hi = min(end_date.toordinal() - first, len(prefix) - 1)
+            total += prefix[hi] - prefix[lo]
+        return total
+
+    def add_working_days(self, start_date, count):
+        # Дата count-го рабочего дня, считая start_date первым кандидатом (count >= 1)
+        year = start_date.year
+        idx = start_date.toordinal() - self._year_table(year)[0]
+        while True:
+            first, prefix = self._year_table(year)
+            available = prefix[-1] - prefix[idx]
+            if count <= available:
+                day_idx = bisect_left(prefix, prefix[idx] + count) - 1
+                return datetime.fromordinal(first + day_idx)
+            count -= available
+            year += 1
+            idx = 0
+
+    def next_working_day(self, date):
+        return self.add_working_days(date, 1)
+
+    def working_days(self, start_date, count):
+        if count <= 0:
+            return WorkingDayRange(self, None, None, 0)
+        first_day = self.next_working_day(start_date)
+        last_day = self.add_working_days(first_day, count)
+        return WorkingDayRange(self, first_day, last_day, count)
+
+
+class WorkingDayRange:
+    """Непрерывная последовательность рабочих дней без материализации списка дат."""
+
+    __slots__ = ('calendar', 'first', 'last', 'count')
+
+    def __init__(self, working_calendar, first, last, count):
+        self.calendar = working_calendar
+        self.first = first
+        self.last = last
+        self.count = count
+
+    def __len__(self):
+        return self.count
+
+    def __getitem__(self, idx):
+        if idx < 0:
+            idx += self.count
+        if not 0 <= idx < self.count:
+            raise IndexError('WorkingDayRange index out of range')
+        if idx == 0:
+            return self.first
+        if idx == self.count - 1:
+            return self.last
+        return self.calendar.add_working_days(self.first, idx + 1)
+
+    def __iter__(self):
+        date = self.first
+        for _ in range(self.count):
+            while not self.calendar.is_working_day(date):
+                date += timedelta(days=1)
+            yield date
+            date += timedelta(days=1)
+
+    def __contains__(self, date):
+        if not self.count or not self.first <= date <= self.last:
+            return False
+        return self.calendar.is_working_day(date)
+
+    def __repr__(self):
+        return f'WorkingDayRange({self.first!r}, {self.last!r}, count={self.count})'
+
+
+@dataclass(frozen=True)
+class SchedulePeriod:
+    """Период графика в компактном виде: границы хранятся ординалами дат, список дней не материализуется."""
+
+    __slots__ = ('year', 'semester', 'type', 'weeks', 'start_ordinal', 'first_ordinal', 'last_ordinal',
+                 'day_count', 'next_ordinal', 'holidays_version')
+
+    year: int
+    semester: int
+    type: str
+    weeks: float
+    # Дата начала периода (может быть нерабочим днём)
+    start_ordinal: int
+    # Первый и последний рабочие дни периода (0, если дней нет)
+    first_ordinal: int
+    last_ordinal: int
+    day_count: int
+    # Контрольная точка цепочки: дата начала следующего периода
+    next_ordinal: int
+    holidays_version: int
+
+    def __reduce__(self):
+        # Замороженный dataclass со __slots__ восстанавливается через конструктор (нужно для pickle)
+        return self.__class__, tuple(getattr(self, name) for name in self.__slots__)
+
+    @property
+    def start_date(self):
+        return datetime.fromordinal(self.start_ordinal)
+
+    @property
+    def end_date(self):
+        return datetime.fromordinal(self.last_ordinal) if self.day_count else self.start_date
+
+    @property
+    def next_date(self):
+        return datetime.fromordinal(self.next_ordinal)
+
+    def days(self, working_calendar):
+        # Рабочие дни периода как WorkingDayRange
+        if not self.day_count:
+            return WorkingDayRange(working_calendar, None, None, 0)
+        return WorkingDayRange(working_calendar, datetime.fromordinal(self.first_ordinal),
+                               datetime.fromordinal(self.last_ordinal), self.day_count)
+
+    def contains(self, date, working_calendar):
+        ordinal = date.toordinal()
+        return (self.day_count > 0 and self.first_ordinal <= ordinal <= self.last_ordinal
+                and working_calendar.is_working_day(date))
+
+
+@dataclass
+class FitConstraints:
+    """Ограничения автоподбора недель; строки задаются номерами в таблице периодов, даты включительно."""
+
+    # Вид деятельности -> минимальное и максимальное число недель
+    min_weeks: dict = field(default_factory=dict)
+    max_weeks: dict = field(default_factory=dict)
+    # Номер строки -> последний допустимый день периода
+    end_by: dict = field(default_factory=dict)
+    # Номер строки -> самая ранняя дата начала периода
+    start_from: dict = field(default_factory=dict)
+    # Строки, недели которых не меняются
+    locked: set = field(default_factory=set)
+
+
+class ActivityIndex:
+    """Таблица интервалов периодов для поиска вида деятельности по дате."""
+
+    def __init__(self, generated_schedule):
+        self.schedule = generated_schedule
+        # Периоды идут подряд и не пересекаются, поэтому начала уже отсортированы
+        self.starts = []
+        self.ends = []
+        self.types = []
+        for period in generated_schedule:
+            if not period.day_count:
+                continue
+            self.starts.append(period.first_ordinal)
+            self.ends.append(period.last_ordinal)
+            self.types.append(period.type)
+
+    def lookup(self, date):
+        # Возвращает тип периода, в границы которого попадает дата (рабочий день не проверяется)
+        ordinal = date.toordinal()
+        idx = bisect_right(self.starts, ordinal) - 1
+        if idx >= 0 and ordinal <= self.ends[idx]:
+            return self.types[idx]
+        return None
+
+
+class YearGrid:
+    """Календарная сетка учебного года (сентябрь-август) без привязки к формату вывода.
+
+    days и categories - матрицы 7×N (строки - дни недели, столбцы - недели месяцев):
+    номер дня месяца (0 для пустых ячеек) и код ячейки CELL_*.
+    """
+
+    def __init__(self, start_year, months, month_weeks, days, categories):
+        self.start_year = start_year
+        self.months = months
+        self.month_weeks = month_weeks
+        self.days = days
+        self.categories = categories
+        self.week_numbers = np.arange(1, days.shape[1] + 1)
+
+    @property
+    def columns(self):
+        return self.days.shape[1]
+
+    def month_spans(self):
+        # (номер месяца, индекс первого столбца, число недель)
+        first_cols = np.cumsum(self.month_weeks) - self.month_weeks
+        return [(int(month), int(first_col), int(weeks))
+                for month, first_col, weeks in zip(self.months, first_cols, self.month_weeks)]
+
+    def cell_texts(self):
+        # Текст ячеек так, как он выводится в Excel: пусто, номер дня или номер дня с обозначением
+        texts = []
+        for day_row, code_row in zip(self.days.tolist(), self.categories.tolist()):
+            row = []
+            for day, code in zip(day_row, code_row):
+                if code == CELL_PADDING:
+                    row.append("")
+                elif code >= CELL_ACTIVITY:
+                    row.append(f"{day}\n{ACTIVITY_TYPES[code - CELL_ACTIVITY]}")
+                else:
+                    row.append(day)
+            texts.append(row)
+        return texts
+
+
+def period_records(periods):
+    # Строки таблицы периодов: DataFrame приводится к списку словарей, список используется как есть
+    if hasattr(periods, 'to_dict'):
+        return periods.to_dict('records')
+    return list(periods)
+
+
+# Таблицы рабочих дней общего хранилища праздников переиспользуются всеми экземплярами приложения
+SHARED_WORKING_CALENDAR = WorkingDayCalendar(HOLIDAY_STORE)
+
+
+class EducationalScheduleApp:
+    def __init__(self, holiday_store=None):
+        self.month_names_ru = {
+            1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
+            5: 'Май', 6: 'Июнь', 7: 'Июль', 8: 'Август',
+            9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
+        }
+
+        # Индекс дат последнего сгенерированного графика
+        self.activity_index = None
+
+        # Число строк, пересчитанных при последней генерации
+        self.rebuilt_rows = 0
+
+        # Праздники и таблицы рабочих дней общие для процесса, если не передано своё хранилище
+        if holiday_store is None or holiday_store is HOLIDAY_STORE:
+            self.holidays = HOLIDAY_STORE
+            self.working_calendar = SHARED_WORKING_CALENDAR
+        else:
+            self.holidays = holiday_store
+            self.working_calendar = WorkingDayCalendar(holiday_store)
+
+    def get_monday_of_week(self, date):
+        days_since_monday = date.weekday()
+        return date - timedelta(days=days_since_monday)
+
+    def is_holiday(self, date):
+        return self.holidays.is_holiday(date)
+
+    def is_working_day(self, date):
+        return self.working_calendar.is_working_day(date)
+
+    def calculate_academic_weeks(self, start_date, weeks_float):
+        working_days_needed = int(weeks_float * 5)
+        schedule_days = self.working_calendar.working_days(start_date, working_days_needed)
+
+        # Следующий период начинается с первого рабочего дня после последнего дня текущего
+        if schedule_days:
+            next_date = self.working_calendar.next_working_day(schedule_days.last + timedelta(days=1))
+        else:
+            next_date = self.working_calendar.next_working_day(start_date)
+
+        return schedule_days, next_date
+
+    @METRICS.timed('generate_schedule')
+    def generate_schedule(self, periods, start_year, previous_schedule=None):
+        # previous_schedule - прошлый результат: строки с теми же параметрами и той же датой начала
+        # переиспользуются, пересчитываются только строки начиная с изменённой
+        start_date = datetime(start_year, 9, 1)
+        current_date = self.get_monday_of_week(start_date)
+
+        generated_schedule = []
+        self.rebuilt_rows = 0
+
+        for row_idx, row in enumerate(period_records(periods)):
+            year = int(row['Год'])
+            semester = int(row['Семестр'])
+            activity_type = row['Тип']
+            weeks = float(row['Недели'])
+
+            previous = self.reusable_period(previous_schedule, row_idx, current_date,
+                                            (year, semester, activity_type, weeks))
+            if previous is not None:
+                generated_schedule.append(previous)
+                current_date = previous.next_date
+                continue
+
+            period_days, next_date = self.calculate_academic_weeks(current_date, weeks)
+
+            period_info = SchedulePeriod(
+                year=year,
+                semester=semester,
+                type=activity_type,
+                weeks=weeks,
+                start_ordinal=current_date.toordinal(),
+                first_ordinal=period_days.first.toordinal() if period_days else 0,
+                last_ordinal=period_days.last.toordinal() if period_days else 0,
+                day_count=len(period_days),
+                next_ordinal=next_date.toordinal(),
+                holidays_version=self.holidays.version
+            )
+
+            generated_schedule.append(period_info)
+            self.rebuilt_rows += 1
+            METRICS.count('generate_schedule.rebuilt_rows')
+            current_date = next_date
+
+        self.activity_index = ActivityIndex(generated_schedule)
+
+        return generated_schedule
+
+    def reusable_period(self, previous_schedule, row_idx, start_date, row_key):
+        if not previous_schedule or row_idx >= len(previous_schedule):
+            return None
+        previous = previous_schedule[row_idx]
+        if not isinstance(previous, SchedulePeriod) or previous.start_ordinal != start_date.toordinal():
+            return None
+        if (previous.year, previous.semester, previous.type, previous.weeks) != row_key:
+            return None
+        if previous.holidays_version != self.holidays.version:
+            return None
+        return previous
+
+    def get_activity_index(self, generated_schedule):
+        # Переиспользуем индекс, если он построен для этого же графика
+        if self.activity_index is None or self.activity_index.schedule is not generated_schedule:
+            self.activity_index = ActivityIndex(generated_schedule)
+        return self.activity_index
+
+    def academic_boundary_constraints(self, periods, start_year, year_end=True, winter_break=True):
+        # Границы учебных лет и семестров: последний период года заканчивается к 31 августа, следующий год
+        # начинается с 1 сентября; первый семестр заканчивается до Нового года, второй - после праздников
+        constraints = FitConstraints()
+        keys = [(int(row['Год']), int(row['Семестр'])) for row in period_records(periods)]
+        for row_idx, (year, semester) in enumerate(keys):
+            next_key = keys[row_idx + 1] if row_idx + 1 < len(keys) else None
+            if next_key == (year, semester):
+                continue
+            calendar_year = start_year + year - 1
+            if next_key is None or next_key[0] != year:
+                if year_end:
+                    constraints.end_by[row_idx] = datetime(calendar_year + 1, 8, 31)
+                    if next_key is not None:
+                        constraints.start_from[row_idx + 1] = datetime(calendar_year + 1, 9, 1)
+            elif winter_break and semester == 1:
+                constraints.end_by[row_idx] = datetime(calendar_year, 12, 31)
+                constraints.start_from[row_idx + 1] = datetime(calendar_year + 1, 1, 1)
+        return constraints
+
+    @METRICS.timed('fit_period_weeks')
+    def fit_period_weeks(self, periods, start_year, constraints):
+        # Подбирает недели периодов под ограничения с минимальным суммарным отклонением от заданных.
+        # Как в calculate_academic_weeks, период из n = int(недели * 5) рабочих дней занимает рабочие дни
+        # [C - n, C) от начала графика, где C - накопленная сумма дней, поэтому ограничения по датам
+        # становятся границами C, а перебор идёт по накопленным суммам без генерации графика
+        records = period_records(periods)
+        rows = [(row['Тип'], float(row['Недели'])) for row in records]
+        if not rows:
+            return periods.copy() if hasattr(periods, 'to_dict') else []
+
+        chain_start = self.working_calendar.next_working_day(self.get_monday_of_week(datetime(start_year, 9, 1)))
+
+        def days_before(date):
+            return self.working_calendar.count_working_days(chain_start, date)
+
+        targets, low, high = [], [], []
+        for row_idx, (activity_type, weeks) in enumerate(rows):
+            target = int(weeks * 5)
+            targets.append(target)
+            if row_idx in constraints.locked:
+                low.append(target)
+                high.append(target)
+                continue
+            if activity_type in constraints.min_weeks:
+                low.append(math.ceil(round(constraints.min_weeks[activity_type] * 5, 6)))
+            else:
+                low.append(min(target, 1))
+            high.append(int(round(constraints.max_weeks.get(activity_type, 52) * 5, 6)))
+
+        count = len(rows)
+        unbounded = sum(high)
+        cum_low = [0] * count
+        cum_high = [unbounded] * count
+        for row_idx, date in constraints.end_by.items():
+            cum_high[row_idx] = min(cum_high[row_idx], days_before(date + timedelta(days=1)))
+        for row_idx, date in constraints.start_from.items():
+            if row_idx == 0:
+                if chain_start < date:
+                    raise ValueError(f"Строка 1: график начинается {chain_start:%d.%m.%Y}, раньше {date:%d.%m.%Y}")
+                continue
+            cum_low[row_idx - 1] = max(cum_low[row_idx - 1], days_before(date))
+
+        # Отсечение недопустимых ветвей: границы накопленных сумм согласуются проходами вперёд и назад
+        for i in range(count):
+            cum_low[i] = max(cum_low[i], (cum_low[i - 1] if i else 0) + low[i])
+            cum_high[i] = min(cum_high[i], (cum_high[i - 1] if i else 0) + high[i])
+        for i in range(count - 2, -1, -1):
+            cum_high[i] = min(cum_high[i], cum_high[i + 1] - low[i + 1])
+            cum_low[i] = max(cum_low[i], cum_low[i + 1] - high[i + 1])
+        for i in range(count):
+            if cum_low[i] > cum_high[i]:
+                raise ValueError(f"Строка {i + 1}: ограничения несовместимы")
+
+        # Динамика по накопленной сумме: cost[c] - минимальное отклонение в днях при C = c
+        infinity = np.iinfo(np.int64).max // 2
+        cost = np.zeros(1, dtype=np.int64)
+        prev_low = 0
+        choices = []
+        for i in range(count):
+            new_cost = np.full(cum_high[i] - cum_low[i] + 1, infinity, dtype=np.int64)
+            choice = np.zeros(len(new_cost), dtype=np.int32)
+            prev_high = prev_low + len(cost) - 1
+            for days in range(max(low[i], cum_low[i] - prev_high), min(high[i], cum_high[i] - prev_low) + 1):
+                first = max(cum_low[i], prev_low + days)
+                last = min(cum_high[i], prev_high + days)
+                candidate = cost[first - days - prev_low:last - days - prev_low + 1] + abs(days - targets[i])
+                window = new_cost[first - cum_low[i]:last - cum_low[i] + 1]
+                better = candidate < window
+                window[better] = candidate[better]
+                choice[first - cum_low[i]:last - cum_low[i] + 1][better] = days
+            cost = new_cost
+            prev_low = cum_low[i]
+            choices.append(choice)
+
+        best = int(np.argmin(cost))
+        if cost[best] >= infinity:
+            raise ValueError("Нет допустимого распределения недель")
+
+        fitted_days = [0] * count
+        total = cum_low[-1] + best
+        for i in range(count - 1, -1, -1):
+            fitted_days[i] = int(choices[i][total - cum_low[i]])
+            total -= fitted_days[i]
+
+        # Недели строк без изменений остаются как есть, остальные - кратны 0.2 (целое число рабочих дней)
+        fitted_weeks = [weeks if days == target else round(days / 5, 1)
+                        for (_, weeks), days, target in zip(rows, fitted_days, targets)]
+        # Результат того же вида, что и вход: DataFrame или список словарей
+        if hasattr(periods, 'to_dict'):
+            fitted = periods.copy()
+            fitted['Недели'] = fitted_weeks
+            return fitted
+        return [{**row, 'Недели': weeks} for row, weeks in zip(records, fitted_weeks)]
+
+    @METRICS.timed('grid.compute')
+    def compute_academic_year_grid(self, start_year, activity_index):
+        # Векторный расчёт сетки за весь учебный год, без openpyxl
+        academic_months = [(start_year, m) for m in range(9, 13)] + [(start_year + 1, m) for m in range(1, 9)]
+        months = np.array([month for _, month in academic_months])
+        month_first = np.array([datetime(year, month, 1).toordinal() for year, month in academic_months])
+        month_info = np.array([calendar.monthrange(year, month) for year, month in academic_months])
+        month_offset, month_length = month_info[:, 0], month_info[:, 1]
+        # Столько же недель, сколько строк у calendar.monthcalendar
+        month_weeks = (month_offset + month_length + 6) // 7
+
+        col_month = np.repeat(np.arange(len(academic_months)), month_weeks)
+        col_week = np.arange(col_month.size) - np.repeat(np.cumsum(month_weeks) - month_weeks, month_weeks)
+        weekday = np.arange(7)[:, None]
+
+        days = col_week[None, :] * 7 + weekday - month_offset[col_month][None, :] + 1
+        valid = (days >= 1) & (days <= month_length[col_month][None, :])
+        ordinals = month_first[col_month][None, :] + days - 1
+        days = np.where(valid, days, 0)
+
+        categories = np.where(valid, CELL_DAY, CELL_PADDING)
+
+        # Виды деятельности: поиск интервала периода для каждой даты
+        if activity_index.starts:
+            starts = np.asarray(activity_index.starts)
+            ends = np.asarray(activity_index.ends)
+            type_codes = np.array([CELL_ACTIVITY + ACTIVITY_TYPES.index(activity_type)
+                                   if activity_type in ACTIVITY_COLORS else CELL_DAY
+                                   for activity_type in activity_index.types])
+            period_idx = np.maximum(np.searchsorted(starts, ordinals, side='right') - 1, 0)
+            in_period = valid & (ordinals >= starts[period_idx]) & (ordinals <= ends[period_idx])
+            categories = np.where(in_period, type_codes[period_idx], categories)
+
+        # Выходные и праздники перекрывают виды деятельности
+        categories = np.where(valid & (weekday >= 5), CELL_WEEKEND, categories)
+        year_first = datetime(start_year, 1, 1).toordinal()
+        holiday_map = np.frombuffer(self.working_calendar.holiday_map(start_year) +
+                                    self.working_calendar.holiday_map(start_year + 1), dtype=np.uint8)
+        is_holiday = holiday_map[np.where(valid, ordinals - year_first, 0)].astype(bool)
+        categories = np.where(valid & is_holiday, CELL_HOLIDAY, categories)
+
+        return YearGrid(start_year, months, month_weeks, days.astype(np.uint8), categories.astype(np.uint8))
+
+    def get_period_days(self, period):
+        return period.days(self.working_calendar)
+
+    def get_activity_for_date(self, date, generated_schedule):
+        if not self.is_working_day(date):
+            return None
+        return self.get_activity_index(generated_schedule).lookup(date)
+
+
+    # Экспорт: модули exporters (с openpyxl и pandas) загружаются при первом вызове
+    def create_excel_file(self, generated_schedule, start_year, program_type):
+        from exporters import excel
+        return excel.create_excel_file(self, generated_schedule, start_year, program_type)
+
+    def export_excel_streaming(self, generated_schedule, start_year, program_type, target):
+        # target - путь к файлу или двоичный поток (файл, сокет, BytesIO)
+        from exporters import excel
+        excel.export_excel_streaming(self, generated_schedule, start_year, program_type, target)
+
+    def schedule_day_frame(self, generated_schedule):
+        from exporters import data
+        return data.schedule_day_frame(self, generated_schedule)
+
+    def export_csv(self, generated_schedule, target):
+        from exporters import data
+        data.export_csv(self, generated_schedule, target)
+
+    def export_parquet(self, generated_schedule, target):
+        from exporters import data
+        data.export_parquet(self, generated_schedule, target)
+
+    def export_ics(self, generated_schedule, start_year, program_type, target):
+        from exporters import data
+        data.export_ics(generated_schedule, start_year, program_type, target)
+
+    def export_json(self, generated_schedule, start_year, program_type, target):
+        from exporters import data
+        data.export_json(generated_schedule, start_year, program_type, target)
+
+
+def schedule_content_hash(generated_schedule, start_year, program_type):
+    # Ключ содержимого графика: одинаковые программы дают одинаковый ключ во всех сессиях
+    content = repr((start_year, program_type, tuple(generated_schedule)))
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+
+# Экземпляр приложения в процессе-обработчике пула (batch, service, parallel_export):
+# праздники и таблицы рабочих дней загружаются один раз на процесс
+_worker_app = None
+
+
+def init_worker(years=()):
+    # Инициализатор ProcessPoolExecutor
+    global _worker_app
+    _worker_app = EducationalScheduleApp()
+    _worker_app.working_calendar.preload(years)
+    return _worker_app
+
+
+def worker_app(years=()):
+    # Приложение процесса; если пул запущен без инициализатора, создаётся при первом обращении
+    if _worker_app is None:
+        init_worker(years)
+    return _worker_app
@@ -0,0 +1,335 @@
+"""Локальный HTTP/JSON-сервис учебных графиков для нескольких подразделений.
+
+Генерация и экспорт выполняются в пуле процессов. Результаты хранятся в общем кеше по содержимому
+запроса, поэтому одинаковые программы разных подразделений считаются один раз, а одинаковые запросы,
+пришедшие во время расчёта, ждут один и тот же результат.
+
+Запросы:
+    POST /schedule          - сводка графика (JSON, как export_json)
+    POST /export/<формат>   - файл графика: xlsx, ics, csv, json, parquet (если установлен pyarrow)
+    GET  /stats             - счётчики запросов и кеша
+    GET  /health
+
+Тело POST: {"program_type": "ординатура", "start_year": 2025, "periods": [{"Год": 1, "Семестр": 1,
+"Тип": "Т", "Недели": 10}, ...]}. Необязательный заголовок X-Tenant - подразделение для статистики.
+
+Пример:
+    python service.py --port 8765 --jobs 4 --ttl 600 --max-entries 512
+"""
+import argparse
+import asyncio
+import hashlib
+import importlib.util
+import io
+import json
+import math
+import os
+import signal
+import sys
+import time
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+from batch import make_job
+from metrics import METRICS
+from schedule_core import ACTIVITY_TYPES, init_worker, worker_app
+
+EXPORT_FORMATS = {
+    'xlsx': "application/vnd.openxmlformats-officedocument.spreadsheetml.sheet",
+    'ics': "text/calendar; charset=utf-8",
+    'csv': "text/csv; charset=utf-8",
+    'json': "application/json; charset=utf-8",
+}
+if importlib.util.find_spec('pyarrow') is not None:
+    EXPORT_FORMATS['parquet'] = "application/vnd.apache.parquet"
+
+STATUS_TEXT = {200: 'OK', 400: 'Bad Request', 404: 'Not Found', 405: 'Method Not Allowed',
+               413: 'Payload Too Large', 500: 'Internal Server Error'}
+MAX_BODY_SIZE = 1 << 20
+# Допустимые значения полей запроса
+MIN_START_YEAR, MAX_START_YEAR = 1900, 3000
+MIN_WEEKS, MAX_WEEKS = 0.1, 52.0
+# Программа длится до трёх лет; запас на длинные каникулы и пересдачи
+MAX_TOTAL_WEEKS = 52 * 5
+
+
+def generate_in_worker(job):
+    app = worker_app(range(job['start_year'], job['start_year'] + 4))
+    return app.generate_schedule(job['periods'], job['start_year'])
+
+
+def export_in_worker(generated_schedule, start_year, program_type, export_format):
+    app = worker_app(range(start_year, start_year + 4))
+    buffer = io.BytesIO()
+    if export_format == 'xlsx':
+        from parallel_export import export_excel_parallel
+
+        # Листы собираются в этом же процессе, без вложенного пула
+        export_excel_parallel(generated_schedule, start_year, program_type, buffer, max_workers=1)
+    elif export_format == 'ics':
+        app.export_ics(generated_schedule, start_year, program_type, buffer)
+    elif export_format == 'csv':
+        app.export_csv(generated_schedule, buffer)
+    elif export_format == 'parquet':
+        app.export_parquet(generated_schedule, buffer)
+    else:
+        app.export_json(generated_schedule, start_year, program_type, buffer)
+    return buffer.getvalue()
+
+
+def parse_job(body):
+    data = json.loads(body or b'{}')
+    if not isinstance(data, dict) or not isinstance(data.get('periods'), list):
+        raise ValueError("ожидается объект с ключом 'periods'")
+    for key in ('name', 'program_type'):
+        if key in data and not isinstance(data[key], str):
+            raise ValueError(f"'{key}' должно быть строкой")
+    job = make_job(data.get('name', 'schedule'), data['periods'], data.get('program_type', 'ординатура'),
+                   data.get('start_year', time.localtime().tm_year))
+    # Значения приводятся к типам редактора, чтобы "10" и 10.0 давали один ключ кеша
+    job['periods'] = [{'Год': int(row['Год']), 'Семестр': int(row['Семестр']), 'Тип': str(row['Тип']),
+                       'Недели': float(row['Недели'])} for row in job['periods']]
+    # Границы те же, что в редакторе: запрос с 1e6 недель или NaN не должен доходить до обработчика
+    if not MIN_START_YEAR <= job['start_year'] <= MAX_START_YEAR:
+        raise ValueError(f"Начальный год вне диапазона {MIN_START_YEAR}-{MAX_START_YEAR}: {job['start_year']}")
+    for row_number, row in enumerate(job['periods'], 1):
+        if row['Тип'] not in ACTIVITY_TYPES:
+            raise ValueError(f"Неизвестный тип периода: {row['Тип']}")
+        if row['Год'] not in (1, 2, 3):
+            raise ValueError(f"Строка {row_number}: год обучения должен быть от 1 до 3")
+        if row['Семестр'] not in (1, 2):
+            raise ValueError(f"Строка {row_number}: семестр должен быть 1 или 2")
+        if not (math.isfinite(row['Недели']) and MIN_WEEKS <= row['Недели'] <= MAX_WEEKS):
+            raise ValueError(f"Строка {row_number}: недель должно быть от {MIN_WEEKS} до {MAX_WEEKS:.0f}")
+    if sum(row['Недели'] for row in job['periods']) > MAX_TOTAL_WEEKS:
+        raise ValueError(f"Суммарная длительность больше {MAX_TOTAL_WEEKS} недель")
+    return job
+
+
+def content_key(job):
+    # Ключ содержимого программы; название программы в ключ не входит
+    content = json.dumps([job['program_type'], job['start_year'], job['periods']], ensure_ascii=False)
+    return hashlib.sha256(content.encode('utf-8')).hexdigest()
+
+
+class TTLCache:
+    """Кеш с вытеснением давно не использованных записей и ограниченным сроком жизни записи."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        # Ключ -> (момент устаревания, значение); порядок - от давно использованных к недавним
+        self._entries = OrderedDict()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] < time.monotonic():
+            del self._entries[key]
+            return None
+        self._entries.move_to_end(key)
+        return entry[1]
+
+    def put(self, key, value):
+        self._entries[key] = (time.monotonic() + self.ttl, value)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+
+class ScheduleService:
+    def __init__(self, executor, cache):
+        self.executor = executor
+        self.cache = cache
+        # Ключ -> задача расчёта, которую ждут все одинаковые запросы
+        self._in_flight = {}
+        self.started = time.monotonic()
+        self.stats = {'requests': 0, 'errors': 0, 'cache_hits': 0, 'cache_misses': 0, 'coalesced': 0}
+        self.tenants = {}
+
+    async def cached(self, key, func, *args):
+        value = self.cache.get(key)
+        if value is not None:
+            self.stats['cache_hits'] += 1
+            METRICS.count('service.cache_hit')
+            return value
+
+        task = self._in_flight.get(key)
+        if task is None:
+            self.stats['cache_misses'] += 1
+            METRICS.count('service.cache_miss')
+            task = asyncio.ensure_future(self._compute(key, func, args))
+            self._in_flight[key] = task
+        else:
+            self.stats['coalesced'] += 1
+            METRICS.count('service.coalesced')
+        # Отмена одного запроса (клиент отключился) не отменяет расчёт для остальных
+        return await asyncio.shield(task)
+
+    async def _compute(self, key, func, args):
+        try:
+            value = await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+            self.cache.put(key, value)
+            return value
+        finally:
+            del self._in_flight[key]
+
+    async def export(self, job, export_format):
+        job_key = content_key(job)
+        generated_schedule = await self.cached(('schedule', job_key), generate_in_worker, job)
+        payload = await self.cached((export_format, job_key), export_in_worker, generated_schedule,
+                                    job['start_year'], job['program_type'], export_format)
+        return payload, job_key
+
+    def snapshot(self):
+        return {
+            **self.stats,
+            'cache_entries': len(self.cache),
+            'in_flight': len(self._in_flight),
+            'uptime_s': round(time.monotonic() - self.started, 1),
+            'tenants': self.tenants,
+        }
+
+    async def dispatch(self, method, path, headers, body):
+        # Возвращает (статус, тип содержимого, тело, дополнительные заголовки)
+        path = path.split('?', 1)[0]
+        if path == '/health':
+            return json_response(200, {'status': 'ok'})
+        if path == '/stats':
+            return json_response(200, self.snapshot())
+
+        if path == '/schedule':
+            export_format = 'json'
+        elif path.startswith('/export/') and path[len('/export/'):] in EXPORT_FORMATS:
+            export_format = path[len('/export/'):]
+        else:
+            return json_response(404, {'error': f"Неизвестный адрес: {path}"})
+        if method != 'POST':
+            return json_response(405, {'error': "Ожидается POST"})
+
+        tenant = headers.get('x-tenant', '-')
+        self.stats['requests'] += 1
+        self.tenants[tenant] = self.tenants.get(tenant, 0) + 1
+
+        try:
+            job = parse_job(body)
+        except (ValueError, KeyError, TypeError, OverflowError) as exc:
+            self.stats['errors'] += 1
+            return json_response(400, {'error': str(exc)})
+
+        try:
+            with METRICS.timer(f'service.{export_format}'):
+                payload, job_key = await self.export(job, export_format)
+        except Exception as exc:
+            self.stats['errors'] += 1
+            return json_response(500, {'error': str(exc)})
+        return 200, EXPORT_FORMATS[export_format], payload, {'ETag': f'"{job_key}"'}
+
+    async def handle_connection(self, reader, writer):
+        # HTTP/1.1 с keep-alive: запросы одного соединения обрабатываются по очереди
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line.strip():
+                    break
+
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if not line.strip():
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                # Без разобранной строки запроса или длины тела границу следующего запроса не найти:
+                # клиент получает ответ с ошибкой, соединение закрывается
+                try:
+                    method, path, version = request_line.decode('latin-1').split()
+                    length = int(headers.get('content-length', 0))
+                    if length < 0:
+                        raise ValueError(length)
+                except ValueError:
+                    self.stats['errors'] += 1
+                    writer.write(http_response(*json_response(400, {'error': "Некорректный запрос"}), False))
+                    await writer.drain()
+                    break
+                if length > MAX_BODY_SIZE:
+                    writer.write(http_response(*json_response(413, {'error': "Слишком большой запрос"}), False))
+                    await writer.drain()
+                    break
+                body = await reader.readexactly(length) if length else b''
+
+                keep_alive = version == 'HTTP/1.1' and headers.get('connection', '').lower() != 'close'
+                try:
+                    response = await self.dispatch(method, path, headers, body)
+                except Exception as exc:
+                    # Непредвиденная ошибка обработчика не должна обрывать соединение без ответа
+                    self.stats['errors'] += 1
+                    response = json_response(500, {'error': str(exc)})
+                writer.write(http_response(*response, keep_alive))
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            writer.close()
+
+
+def json_response(status, data):
+    return status, "application/json; charset=utf-8", json.dumps(data, ensure_ascii=False).encode('utf-8'), {}
+
+
+def http_response(status, content_type, payload, extra_headers, keep_alive):
+    headers = [
+        f"HTTP/1.1 {status} {STATUS_TEXT[status]}",
+        f"Content-Type: {content_type}",
+        f"Content-Length: {len(payload)}",
+        f"Connection: {'keep-alive' if keep_alive else 'close'}",
+    ]
+    headers += [f"{name}: {value}" for name, value in extra_headers.items()]
+    return ('\r\n'.join(headers) + '\r\n\r\n').encode('latin-1') + payload
+
+
+async def serve(args):
+    current_year = time.localtime().tm_year
+    # Праздники нужны на годы ближайших наборов и на запас для переходящих периодов
+    years = range(current_year - 3, current_year + 8)
+    with ProcessPoolExecutor(max_workers=args.jobs, initializer=init_worker, initargs=(years,)) as executor:
+        service = ScheduleService(executor, TTLCache(args.max_entries, args.ttl))
+        server = await asyncio.start_server(service.handle_connection, args.host, args.port)
+        print(f"Сервис графиков: http://{args.host}:{args.port} (процессов: {args.jobs}, "
+              f"кеш: {args.max_entries} записей на {args.ttl:.0f} с)", flush=True)
+        # По SIGTERM/SIGINT сервер останавливается штатно, и пул завершает процессы-обработчики
+        stop = asyncio.Event()
+        for signum in (signal.SIGINT, signal.SIGTERM):
+            try:
+                asyncio.get_running_loop().add_signal_handler(signum, stop.set)
+            except NotImplementedError:
+                pass
+        async with server:
+            await stop.wait()
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="HTTP/JSON-сервис учебных графиков")
+    parser.add_argument('--host', default='127.0.0.1', help="адрес для подключений")
+    parser.add_argument('--port', type=int, default=8765, help="порт")
+    parser.add_argument('-j', '--jobs', type=int, default=os.cpu_count(), help="число процессов")
+    parser.add_argument('--ttl', type=float, default=600, help="срок жизни записи кеша, с")
+    parser.add_argument('--max-entries', type=int, default=512, help="число записей кеша")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    asyncio.run(serve(args))
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
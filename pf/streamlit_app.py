@@ -1,296 +1,95 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime, timedelta
-from functools import lru_cache
-import calendar
-from openpyxl import Workbook
-from openpyxl.styles import Font, PatternFill, Border, Side, Alignment
-from openpyxl.utils import get_column_letter
+from datetime import datetime
+import numpy as np
+from metrics import METRICS
+from schedule_core import (
+    ACTIVITY_COLORS, ACTIVITY_TYPES, HOLIDAY_COLOR, PADDING_COLOR, POSTGRADUATE_EXAMPLE, RESIDENCY_EXAMPLE,
+    WEEKEND_COLOR, EducationalScheduleApp, schedule_content_hash,
+)
+import importlib.util
 import io
+from concurrent.futures import ThreadPoolExecutor
 
-# Настройка страницы
-st.set_page_config(
-    page_title="Учебный график",
-    page_icon="📅",
-    layout="wide"
-)
 
+# Кеш готовых xlsx общий для всех сессий процесса; при переполнении вытесняются давно не использованные
+@st.cache_data(max_entries=64, show_spinner=False)
+def build_excel_bytes(schedule_key, start_year, program_type, _generated_schedule):
+    # _generated_schedule не хешируется Streamlit: его содержимое уже учтено в schedule_key
+    METRICS.count('excel.cache_miss')
+    wb = EducationalScheduleApp().create_excel_file(_generated_schedule, start_year, program_type)
+    buffer = io.BytesIO()
+    with METRICS.timer('excel.save'):
+        wb.save(buffer)
+    return buffer.getvalue()
 
-class EducationalScheduleApp:
-    def __init__(self):
-        self.month_names_ru = {
-            1: 'Январь', 2: 'Февраль', 3: 'Март', 4: 'Апрель',
-            5: 'Май', 6: 'Июнь', 7: 'Июль', 8: 'Август',
-            9: 'Сентябрь', 10: 'Октябрь', 11: 'Ноябрь', 12: 'Декабрь'
-        }
 
-        # Кеш динамических праздников по годам (заполняется при первом обращении)
-        self._holidays_cache = {}
+# Файлы данных кешируются так же, как xlsx: по ключу содержимого графика и формату
+@st.cache_data(max_entries=256, show_spinner=False)
+def build_data_export_bytes(schedule_key, start_year, program_type, export_format, _generated_schedule):
+    METRICS.count('export.cache_miss')
+    app = EducationalScheduleApp()
+    buffer = io.BytesIO()
+    if export_format == 'ics':
+        app.export_ics(_generated_schedule, start_year, program_type, buffer)
+    elif export_format == 'csv':
+        app.export_csv(_generated_schedule, buffer)
+    elif export_format == 'parquet':
+        app.export_parquet(_generated_schedule, buffer)
+    else:
+        app.export_json(_generated_schedule, start_year, program_type, buffer)
+    return buffer.getvalue()
 
-    @lru_cache(maxsize=64)
-    def _get_ru_holidays_for_year(self, year: int):
-        try:
-            import holidays  # type: ignore
-            ru_holidays = holidays.RU(years=year)
-            # Преобразуем к множеству строк YYYY-MM-DD для быстрого поиска
-            return {d.strftime('%Y-%m-%d') for d in ru_holidays.keys()}
-        except Exception:
-            # Если зависимости нет или ошибка, возвращаем пустой набор
-            return set()
-
-    def get_monday_of_week(self, date):
-        days_since_monday = date.weekday()
-        return date - timedelta(days=days_since_monday)
-
-    def is_holiday(self, date):
-        year = date.year
-        date_str = date.strftime('%Y-%m-%d')
-        return date_str in self._get_ru_holidays_for_year(year)
-
-    def is_working_day(self, date):
-        return date.weekday() < 5 and not self.is_holiday(date)
-
-    def calculate_academic_weeks(self, start_date, weeks_float):
-        current_date = start_date
-        working_days_needed = int(weeks_float * 5)
-        working_days_count = 0
-        schedule_days = []
-
-        while working_days_count < working_days_needed:
-            if self.is_working_day(current_date):
-                schedule_days.append(current_date)
-                working_days_count += 1
-            current_date += timedelta(days=1)
-
-        while not self.is_working_day(current_date):
-            current_date += timedelta(days=1)
-
-        return schedule_days, current_date
-
-    def generate_schedule(self, periods_df, start_year):
-        start_date = datetime(start_year, 9, 1)
-        current_date = self.get_monday_of_week(start_date)
-
-        generated_schedule = []
-
-        for _, row in periods_df.iterrows():
-            year = int(row['Год'])
-            semester = int(row['Семестр'])
-            activity_type = row['Тип']
-            weeks = float(row['Недели'])
-
-            period_days, next_date = self.calculate_academic_weeks(current_date, weeks)
-
-            period_info = {
-                'year': year,
-                'semester': semester,
-                'type': activity_type,
-                'weeks': weeks,
-                'start_date': current_date,
-                'end_date': period_days[-1] if period_days else current_date,
-                'days': period_days
-            }
 
-            generated_schedule.append(period_info)
-            current_date = next_date
+# Цвета ячеек предпросмотра сетки (индекс = код ячейки)
+CELL_PREVIEW_COLORS = ([PADDING_COLOR, None, WEEKEND_COLOR, HOLIDAY_COLOR] +
+                       [ACTIVITY_COLORS[name] for name in ACTIVITY_TYPES])
 
-        return generated_schedule
 
-    def create_excel_file(self, generated_schedule, start_year, program_type):
-        wb = Workbook()
-        program_years = 2 if "Ординатура" in program_type else 3
+def grid_preview_styler(grid, month_names):
+    col_months = np.repeat(grid.months, grid.month_weeks).tolist()
+    columns = [f"{month_names[month][:3]} {week}" for month, week in zip(col_months, grid.week_numbers.tolist())]
+    texts = [[str(text).replace("\n", " ") for text in row] for row in grid.cell_texts()]
+    frame = pd.DataFrame(texts, index=['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс'], columns=columns)
 
-        # Стили
-        header_font = Font(bold=True)
-        thin_border = Border(left=Side(style='thin'), right=Side(style='thin'),
-                             top=Side(style='thin'), bottom=Side(style='thin'))
+    css = [[f"background-color: #{CELL_PREVIEW_COLORS[code]}" if CELL_PREVIEW_COLORS[code] else ""
+            for code in row] for row in grid.categories.tolist()]
+    css_frame = pd.DataFrame(css, index=frame.index, columns=frame.columns)
+    return frame.style.apply(lambda _: css_frame, axis=None)
 
-        activity_fills = {
-            'Т': PatternFill(start_color="90EE90", end_color="90EE90", fill_type="solid"),
-            'П': PatternFill(start_color="87CEEB", end_color="87CEEB", fill_type="solid"),
-            'ПА': PatternFill(start_color="FFE4B5", end_color="FFE4B5", fill_type="solid"),
-            'ГИА': PatternFill(start_color="DDA0DD", end_color="DDA0DD", fill_type="solid"),
-            'К': PatternFill(start_color="F0E68C", end_color="F0E68C", fill_type="solid")
-        }
 
-        weekend_fill = PatternFill(start_color="E6E6FA", end_color="E6E6FA", fill_type="solid")
-        holiday_fill = PatternFill(start_color="FFB6C1", end_color="FFB6C1", fill_type="solid")
+@st.cache_resource
+def get_export_executor():
+    # Общий для всех сессий пул потоков для сборки Excel
+    return ThreadPoolExecutor(max_workers=2, thread_name_prefix='excel-export')
 
-        # Создать листы для каждого года
-        for academic_year in range(program_years):
-            actual_year = start_year + academic_year
 
-            if academic_year == 0:
-                ws = wb.active
-                ws.title = f"{actual_year}-{actual_year + 1}"
-            else:
-                ws = wb.create_sheet(f"{actual_year}-{actual_year + 1}")
-
-            self.create_academic_year_calendar(ws, actual_year, header_font,
-                                               weekend_fill, holiday_fill, activity_fills,
-                                               thin_border, generated_schedule)
-
-        # Лист с обозначениями
-        legend_ws = wb.create_sheet("Обозначения")
-        self.create_legend_sheet(legend_ws, header_font, activity_fills,
-                                 weekend_fill, holiday_fill, thin_border)
-
-        return wb
-
-    def create_academic_year_calendar(self, ws, start_year, header_font,
-                                      weekend_fill, holiday_fill, activity_fills,
-                                      thin_border, generated_schedule):
-
-        # Заголовок
-        ws.merge_cells('A1:AH1')
-        ws['A1'] = f"Календарный учебный график {start_year}-{start_year + 1} г."
-        ws['A1'].font = Font(size=16, bold=True)
-        ws['A1'].alignment = Alignment(horizontal='center')
-
-        # Месяцы учебного года (сентябрь-август)
-        academic_months = [(start_year, m) for m in range(9, 13)] + [(start_year + 1, m) for m in range(1, 9)]
-
-        # Строка 2 - названия месяцев
-        current_col = 2
-
-        for year, month in academic_months:
-            month_name = self.month_names_ru[month]
-            cal = calendar.monthcalendar(year, month)
-            month_weeks = len(cal)
-
-            # Заголовок месяца
-            if month_weeks > 1:
-                ws.merge_cells(f'{get_column_letter(current_col)}2:{get_column_letter(current_col + month_weeks - 1)}2')
-
-            cell = ws.cell(row=2, column=current_col)
-            cell.value = month_name
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = thin_border
-
-            current_col += month_weeks
-
-        # Дни недели в первой колонке
-        days_of_week = ['Пн', 'Вт', 'Ср', 'Чт', 'Пт', 'Сб', 'Вс']
-
-        ws['A2'] = 'Мес'
-        ws['A2'].font = header_font
-        ws['A2'].alignment = Alignment(horizontal='center')
-        ws['A2'].border = thin_border
-
-        for row_idx, day_name in enumerate(days_of_week, 3):
-            cell = ws['A{}'.format(row_idx)]
-            cell.value = day_name
-            cell.font = header_font
-            cell.alignment = Alignment(horizontal='center')
-            cell.border = thin_border
-
-        ws['A10'] = 'Нед'
-        ws['A10'].font = header_font
-        ws['A10'].alignment = Alignment(horizontal='center')
-        ws['A10'].border = thin_border
-
-        # Заполняем календарную сетку
-        current_col = 2
-        week_number = 1
-
-        for year, month in academic_months:
-            cal = calendar.monthcalendar(year, month)
-
-            for week_idx, week in enumerate(cal):
-                col = current_col + week_idx
-
-                # Номер недели
-                ws.cell(row=10, column=col).value = week_number
-                ws.cell(row=10, column=col).alignment = Alignment(horizontal='center')
-                ws.cell(row=10, column=col).border = thin_border
-                week_number += 1
-
-                # Дни недели
-                for day_idx, day in enumerate(week):
-                    row = 3 + day_idx
-                    cell = ws.cell(row=row, column=col)
-                    cell.border = thin_border
-
-                    if day == 0:
-                        cell.value = ""
-                        cell.fill = PatternFill(start_color="F5F5F5", end_color="F5F5F5", fill_type="solid")
-                    else:
-                        date = datetime(year, month, day)
-                        cell.value = day
-                        cell.alignment = Alignment(horizontal='center')
-
-                        # Применяем цвета и обозначения
-                        if self.is_holiday(date):
-                            cell.fill = holiday_fill
-                        elif date.weekday() >= 5:
-                            cell.fill = weekend_fill
-                        else:
-                            activity_type = self.get_activity_for_date(date, generated_schedule)
-                            if activity_type and activity_type in activity_fills:
-                                cell.fill = activity_fills[activity_type]
-                                cell.value = f"{day}\n{activity_type}"
-                                cell.alignment = Alignment(horizontal='center', vertical='center')
-                                cell.font = Font(size=9)
-
-            current_col += len(cal)
-
-        # Настройка размеров
-        ws.column_dimensions['A'].width = 6
-        for col in range(2, current_col):
-            ws.column_dimensions[get_column_letter(col)].width = 5
-
-        for row in range(3, 10):
-            ws.row_dimensions[row].height = 25
-
-    def get_activity_for_date(self, date, generated_schedule):
-        for period in generated_schedule:
-            if date in period['days']:
-                return period['type']
-        return None
-
-    def create_legend_sheet(self, ws, header_font, activity_fills, weekend_fill, holiday_fill, thin_border):
-        ws['A1'] = "Условные обозначения"
-        ws['A1'].font = Font(size=16, bold=True)
-
-        ws['A3'] = "Типы занятий:"
-        ws['A3'].font = header_font
-
-        activity_names = ['Т', 'П', 'ПА', 'ГИА', 'К']
-        activity_descriptions = ['Теоретическая подготовка', 'Практика', 'Промежуточная аттестация',
-                                 'Государственная итоговая аттестация', 'Каникулы']
-
-        for i, name in enumerate(activity_names):
-            col = chr(66 + i)
-            ws[f'{col}4'] = name
-            ws[f'{col}4'].font = header_font
-            ws[f'{col}4'].fill = activity_fills[name]
-            ws[f'{col}4'].border = thin_border
-            ws[f'{col}4'].alignment = Alignment(horizontal='center')
-
-            ws[f'{col}5'] = activity_descriptions[i]
-            ws[f'{col}5'].border = thin_border
-            ws[f'{col}5'].alignment = Alignment(horizontal='center')
-
-        ws['A7'] = "Прочие обозначения:"
-        ws['A7'].font = header_font
-
-        ws['B8'] = "Выходные"
-        ws['B8'].fill = weekend_fill
-        ws['B8'].border = thin_border
-        ws['B8'].alignment = Alignment(horizontal='center')
-
-        ws['C8'] = "Праздники"
-        ws['C8'].fill = holiday_fill
-        ws['C8'].border = thin_border
-        ws['C8'].alignment = Alignment(horizontal='center')
-
-        for col_letter in ['A', 'B', 'C', 'D', 'E', 'F']:
-            ws.column_dimensions[col_letter].width = 20
+def submit_excel_export():
+    schedule_key = schedule_content_hash(
+        st.session_state.generated_schedule,
+        st.session_state.start_year,
+        st.session_state.program_type
+    )
+    excel_export = get_export_executor().submit(
+        build_excel_bytes,
+        schedule_key,
+        st.session_state.start_year,
+        st.session_state.program_type,
+        st.session_state.generated_schedule
+    )
+    st.session_state.excel_export = excel_export
+    return excel_export
 
 
 # Основное приложение
 def main():
+    # Настройка страницы: при запуске, а не при импорте модуля
+    st.set_page_config(
+        page_title="Учебный график",
+        page_icon="📅",
+        layout="wide"
+    )
+
     st.title("Учебный график")
 
     app = EducationalScheduleApp()
@@ -316,50 +115,9 @@ def main():
         example_label = "Пример ординатуры" if "Ординатура" in program_type else "Пример аспирантуры"
         if st.button(example_label):
             if "Ординатура" in program_type:
-                st.session_state.periods_data = [
-                    {"Год": 1, "Семестр": 1, "Тип": "Т", "Недели": 10},
-                    {"Год": 1, "Семестр": 1, "Тип": "П", "Недели": 12},
-                    {"Год": 1, "Семестр": 1, "Тип": "ПА", "Недели": 1},
-                    {"Год": 1, "Семестр": 2, "Тип": "Т", "Недели": 4},
-                    {"Год": 1, "Семестр": 2, "Тип": "П", "Недели": 16},
-                    {"Год": 1, "Семестр": 2, "Тип": "ПА", "Недели": 1},
-                    {"Год": 1, "Семестр": 2, "Тип": "К", "Недели": 6},
-                    {"Год": 2, "Семестр": 1, "Тип": "Т", "Недели": 10},
-                    {"Год": 2, "Семестр": 1, "Тип": "П", "Недели": 12},
-                    {"Год": 2, "Семестр": 1, "Тип": "ПА", "Недели": 1},
-                    {"Год": 2, "Семестр": 2, "Тип": "Т", "Недели": 9},
-                    {"Год": 2, "Семестр": 2, "Тип": "П", "Недели": 8},
-                    {"Год": 2, "Семестр": 2, "Тип": "ПА", "Недели": 1},
-                    {"Год": 2, "Семестр": 2, "Тип": "ГИА", "Недели": 2},
-                    {"Год": 2, "Семестр": 2, "Тип": "К", "Недели": 6}
-                ]
+                st.session_state.periods_data = [dict(row) for row in RESIDENCY_EXAMPLE]
             else:
-                st.session_state.periods_data = [
-                    # Год 1
-                    {"Год": 1, "Семестр": 1, "Тип": "Т", "Недели": 12},
-                    {"Год": 1, "Семестр": 1, "Тип": "П", "Недели": 12},
-                    {"Год": 1, "Семестр": 1, "Тип": "ПА", "Недели": 2},
-                    {"Год": 1, "Семестр": 2, "Тип": "Т", "Недели": 8},
-                    {"Год": 1, "Семестр": 2, "Тип": "П", "Недели": 12},
-                    {"Год": 1, "Семестр": 2, "Тип": "ПА", "Недели": 2},
-                    {"Год": 1, "Семестр": 2, "Тип": "К", "Недели": 4},
-                    # Год 2
-                    {"Год": 2, "Семестр": 1, "Тип": "Т", "Недели": 10},
-                    {"Год": 2, "Семестр": 1, "Тип": "П", "Недели": 14},
-                    {"Год": 2, "Семестр": 1, "Тип": "ПА", "Недели": 2},
-                    {"Год": 2, "Семестр": 2, "Тип": "Т", "Недели": 6},
-                    {"Год": 2, "Семестр": 2, "Тип": "П", "Недели": 14},
-                    {"Год": 2, "Семестр": 2, "Тип": "ПА", "Недели": 2},
-                    {"Год": 2, "Семестр": 2, "Тип": "К", "Недели": 4},
-                    # Год 3
-                    {"Год": 3, "Семестр": 1, "Тип": "Т", "Недели": 6},
-                    {"Год": 3, "Семестр": 1, "Тип": "П", "Недели": 16},
-                    {"Год": 3, "Семестр": 1, "Тип": "ПА", "Недели": 2},
-                    {"Год": 3, "Семестр": 2, "Тип": "Т", "Недели": 4},
-                    {"Год": 3, "Семестр": 2, "Тип": "П", "Недели": 12},
-                    {"Год": 3, "Семестр": 2, "Тип": "ГИА", "Недели": 4},
-                    {"Год": 3, "Семестр": 2, "Тип": "К", "Недели": 6}
-                ]
+                st.session_state.periods_data = [dict(row) for row in POSTGRADUATE_EXAMPLE]
 
     with col4:
         if st.button("Очистить"):
@@ -375,6 +133,9 @@ def main():
     st.subheader("Периоды обучения")
 
     if st.session_state.periods_data:
+        with st.expander("Автоподбор недель"):
+            show_week_fitting(app, start_year)
+
         edited_df = st.data_editor(
             pd.DataFrame(st.session_state.periods_data),
             use_container_width=True,
@@ -401,35 +162,30 @@ def main():
             if st.session_state.periods_data:
                 with st.spinner("Генерация..."):
                     periods_df = pd.DataFrame(st.session_state.periods_data)
-                    generated_schedule = app.generate_schedule(periods_df, start_year)
+                    generated_schedule = app.generate_schedule(
+                        periods_df, start_year, st.session_state.get('generated_schedule')
+                    )
                     st.session_state.generated_schedule = generated_schedule
                     st.session_state.start_year = start_year
                     st.session_state.program_type = program_type
 
-                st.success(f"График готов! Создано периодов: {len(generated_schedule)}")
+                # Excel строится в фоне, генерация его не ждёт
+                submit_excel_export()
+
+                st.success(f"График готов! Создано периодов: {len(generated_schedule)}, "
+                           f"пересчитано: {app.rebuilt_rows}")
             else:
                 st.error("Добавьте периоды обучения")
 
     with col2:
-        if 'generated_schedule' in st.session_state:
-            wb = app.create_excel_file(
-                st.session_state.generated_schedule,
-                st.session_state.start_year,
-                st.session_state.program_type
-            )
-
-            buffer = io.BytesIO()
-            wb.save(buffer)
-            buffer.seek(0)
-
-            st.download_button(
-                label="Скачать Excel",
-                data=buffer,
-                file_name=f"график_{st.session_state.start_year}-{st.session_state.start_year + 1}.xlsx",
-                mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
-            )
+        excel_export = st.session_state.get('excel_export')
+        if excel_export is None and 'generated_schedule' in st.session_state:
+            excel_export = submit_excel_export()
+
+        if excel_export is not None and not excel_export.done():
+            poll_excel_download()
         else:
-            st.button("Скачать Excel", disabled=True)
+            show_excel_download()
 
     # Предварительный просмотр
     if 'generated_schedule' in st.session_state:
@@ -438,17 +194,129 @@ def main():
         preview_data = []
         for period in st.session_state.generated_schedule:
             preview_data.append({
-                "Год": period['year'],
-                "Семестр": period['semester'],
-                "Тип": period['type'],
-                "Недели": f"{period['weeks']:.1f}",
-                "Начало": period['start_date'].strftime('%d.%m.%Y'),
-                "Конец": period['end_date'].strftime('%d.%m.%Y'),
-                "Дней": len(period['days'])
+                "Год": period.year,
+                "Семестр": period.semester,
+                "Тип": period.type,
+                "Недели": f"{period.weeks:.1f}",
+                "Начало": period.start_date.strftime('%d.%m.%Y'),
+                "Конец": period.end_date.strftime('%d.%m.%Y'),
+                "Дней": period.day_count
             })
 
         st.dataframe(pd.DataFrame(preview_data), use_container_width=True, hide_index=True)
 
+        with st.expander("Календарная сетка"):
+            preview_start_year = st.session_state.start_year
+            program_years = 2 if "Ординатура" in st.session_state.program_type else 3
+            activity_index = app.get_activity_index(st.session_state.generated_schedule)
+            year_tabs = st.tabs([f"{preview_start_year + i}-{preview_start_year + i + 1}"
+                                 for i in range(program_years)])
+            for academic_year, tab in enumerate(year_tabs):
+                with tab:
+                    grid = app.compute_academic_year_grid(preview_start_year + academic_year, activity_index)
+                    st.dataframe(grid_preview_styler(grid, app.month_names_ru), use_container_width=True)
+
+        with st.expander("Экспорт данных"):
+            show_data_exports()
+
+    if METRICS.enabled:
+        show_metrics_panel()
+
+
+def show_excel_download():
+    excel_export = st.session_state.get('excel_export')
+    if excel_export is None:
+        st.button("Скачать Excel", disabled=True)
+    elif not excel_export.done():
+        st.button("Excel готовится...", disabled=True)
+    elif excel_export.exception() is not None:
+        st.error(f"Не удалось построить Excel: {excel_export.exception()}")
+    else:
+        st.download_button(
+            label="Скачать Excel",
+            data=excel_export.result(),
+            file_name=f"график_{st.session_state.start_year}-{st.session_state.start_year + 1}.xlsx",
+            mime="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet"
+        )
+
+
+@st.fragment(run_every=0.5)
+def poll_excel_download():
+    # Пока Excel собирается, по таймеру перерисовывается только кнопка, и скрипт не ждёт сборку.
+    # Когда книга готова, страница перезапускается целиком, чтобы кнопка отрисовалась уже без опроса
+    excel_export = st.session_state.get('excel_export')
+    if excel_export is not None and excel_export.done():
+        st.rerun()
+    show_excel_download()
+
+
+def show_week_fitting(app, start_year):
+    # Подбор недель выполняется до отрисовки редактора, чтобы он сразу показал новые значения
+    col1, col2 = st.columns(2)
+    with col1:
+        year_end = st.checkbox("Каникулы заканчиваются 31 августа", value=True)
+    with col2:
+        winter_break = st.checkbox("Второй семестр начинается после новогодних праздников", value=True)
+
+    min_weeks = {}
+    for col, name in zip(st.columns(len(ACTIVITY_TYPES)), ACTIVITY_TYPES):
+        with col:
+            value = st.number_input(f"Мин. недель: {name}", min_value=0.0, max_value=52.0, value=0.0, step=0.2,
+                                    format="%.1f", key=f"fit_min_{name}")
+        if value > 0:
+            min_weeks[name] = value
+
+    if st.button("Подобрать недели"):
+        periods_df = pd.DataFrame(st.session_state.periods_data)
+        constraints = app.academic_boundary_constraints(periods_df, start_year, year_end, winter_break)
+        constraints.min_weeks = min_weeks
+        try:
+            fitted_df = app.fit_period_weeks(periods_df, start_year, constraints)
+        except ValueError as e:
+            st.error(f"Не удалось подобрать недели: {e}")
+        else:
+            changed = int((fitted_df['Недели'] != periods_df['Недели']).sum())
+            st.session_state.periods_data = fitted_df.to_dict('records')
+            st.success(f"Недели подобраны, изменено строк: {changed}")
+
+
+def show_data_exports():
+    # Данные графика для внешних систем строятся из модели графика, без сборки книги Excel.
+    # Тело expander выполняется при каждом перезапуске, поэтому файлы берутся из кеша
+    generated_schedule = st.session_state.generated_schedule
+    start_year = st.session_state.start_year
+    program_type = st.session_state.program_type
+    schedule_key = schedule_content_hash(generated_schedule, start_year, program_type)
+    file_stem = f"график_{start_year}-{start_year + 1}"
+
+    exports = [
+        ("iCalendar", "ics", "text/calendar"),
+        ("CSV", "csv", "text/csv"),
+        ("JSON", "json", "application/json"),
+    ]
+    if importlib.util.find_spec('pyarrow') is not None:
+        exports.append(("Parquet", "parquet", "application/vnd.apache.parquet"))
+
+    for col, (label, extension, mime) in zip(st.columns(len(exports)), exports):
+        data = build_data_export_bytes(schedule_key, start_year, program_type, extension, generated_schedule)
+        with col:
+            st.download_button(label=label, data=data, file_name=f"{file_stem}.{extension}",
+                               mime=mime, key=f"data_export_{extension}")
+
+
+def show_metrics_panel():
+    snapshot = METRICS.snapshot()
+    with st.expander("Отладка: замеры"):
+        timers = [{"Этап": name, "Вызовов": stats['count'], "Последний, мс": round(stats['last_ms'], 2),
+                   "Средний, мс": round(stats['mean_ms'], 2), "Максимум, мс": round(stats['max_ms'], 2)}
+                  for name, stats in sorted(snapshot['timers'].items())]
+        if timers:
+            st.dataframe(pd.DataFrame(timers), use_container_width=True, hide_index=True)
+        st.json(snapshot['counters'])
+        if st.button("Сбросить замеры"):
+            METRICS.reset()
+
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with METRICS.timer('streamlit.rerun'):
+        main()
\ No newline at end of file